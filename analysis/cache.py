@@ -0,0 +1,78 @@
+"""In-process TTL cache for read-only analysis queries."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# cache_clear of every decorated function, for invalidate_caches()
+_registry: list[Callable[[], None]] = []
+
+
+def async_ttl_cache(
+    ttl: float,
+    maxsize: int = 128,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Cache an ``async def f(pool, *args, **kwargs)`` for ``ttl`` seconds.
+
+    The pool is not part of the key, so results survive pool re-creation
+    between CLI steps.  Concurrent callers with the same key share one
+    in-flight query; each awaits it through ``asyncio.shield``, so a
+    cancelled caller does not cancel the query for the others.  Cached
+    DataFrames are shared — treat them as read-only.
+    """
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        cache: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        inflight: dict[Hashable, asyncio.Task[T]] = {}
+        # Bumped by cache_clear, so a query started before it isn't cached
+        generation = [0]
+
+        def settle(key: Hashable, started: int, task: asyncio.Task[T]) -> None:
+            if inflight.get(key) is task:
+                del inflight[key]
+            # A failed query is only evicted, never cached
+            if task.cancelled() or task.exception() is not None or started != generation[0]:
+                return
+            cache[key] = (time.monotonic() + ttl, task.result())
+            cache.move_to_end(key)
+            while len(cache) > maxsize:
+                cache.popitem(last=False)
+
+        @functools.wraps(func)
+        async def wrapper(pool: Any, *args: Any, **kwargs: Any) -> T:
+            key = (args, tuple(sorted(kwargs.items())))
+            hit = cache.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                cache.move_to_end(key)
+                return hit[1]
+
+            task = inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(func(pool, *args, **kwargs))
+                inflight[key] = task
+                task.add_done_callback(functools.partial(settle, key, generation[0]))
+            return await asyncio.shield(task)
+
+        def cache_clear() -> None:
+            generation[0] += 1
+            cache.clear()
+            inflight.clear()
+
+        wrapper.cache_clear = cache_clear  # type: ignore[attr-defined]
+        _registry.append(cache_clear)
+        return wrapper
+
+    return decorator
+
+
+def invalidate_caches() -> None:
+    """Drop every cached analysis result, e.g. after new data is loaded."""
+    for cache_clear in _registry:
+        cache_clear()
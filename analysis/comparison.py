@@ -2,25 +2,22 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 import asyncpg
 import pandas as pd
 from loguru import logger
 
+from analysis.frames import (
+    format_month,
+    pivot_records_to_df,
+    records_to_df,
+)
 
-async def compare_companies(
-    pool: asyncpg.Pool,
-    stirs: list[str],
-) -> dict[str, Any]:
-    """Side-by-side comparison of companies by STIRs."""
-    if not stirs or len(stirs) < 2:
-        logger.warning("Need at least 2 STIRs for comparison")
-        return {}
 
-    result: dict[str, Any] = {}
-
-    # Summary metrics side by side
+async def _fetch_summary(pool: asyncpg.Pool, stirs: list[str]) -> pd.DataFrame:
+    """Summary metrics side by side."""
     rows = await pool.fetch(
         """
         SELECT
@@ -40,41 +37,39 @@ async def compare_companies(
         """,
         stirs,
     )
-    result["summary"] = pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
+
 
-    # Rating categories comparison
+async def _fetch_rating_comparison(pool: asyncpg.Pool, stirs: list[str]) -> pd.DataFrame:
+    """Rating category points with companies as columns, pivoted in SQL."""
     rows = await pool.fetch(
         """
         SELECT
-            cr.company_stir                     AS "СТИР",
-            c.canonical_name                    AS "Компания",
-            rc.name_ru                          AS "Категория",
-            ROUND(SUM(cr.earned_points), 2)     AS "Баллы",
-            ROUND(SUM(cr.max_points), 2)        AS "Макс."
-        FROM company_ratings cr
-        JOIN rating_criteria rk ON cr.criterion_id = rk.id
-        JOIN rating_categories rc ON rk.category_id = rc.id
-        JOIN companies c ON cr.company_stir = c.stir
-        WHERE cr.company_stir = ANY($1::varchar[])
-        GROUP BY cr.company_stir, c.canonical_name, rc.id, rc.name_ru, rc.display_order
-        ORDER BY rc.display_order, cr.company_stir
+            "Категория",
+            -- Later keys win in jsonb, so the lowest STIR wins on a name clash
+            jsonb_object_agg("Компания", "Баллы" ORDER BY "СТИР" DESC) AS scores
+        FROM (
+            SELECT
+                cr.company_stir                     AS "СТИР",
+                c.canonical_name                    AS "Компания",
+                rc.name_ru                          AS "Категория",
+                ROUND(SUM(cr.earned_points), 2)     AS "Баллы"
+            FROM company_ratings cr
+            JOIN rating_criteria rk ON cr.criterion_id = rk.id
+            JOIN rating_categories rc ON rk.category_id = rc.id
+            JOIN companies c ON cr.company_stir = c.stir
+            WHERE cr.company_stir = ANY($1::varchar[])
+            GROUP BY cr.company_stir, c.canonical_name, rc.id, rc.name_ru
+        ) per_company
+        GROUP BY "Категория"
         """,
         stirs,
     )
-    if rows:
-        df = pd.DataFrame([dict(r) for r in rows])
-        # Pivot to get companies as columns
-        pivot = df.pivot_table(
-            index="Категория",
-            columns="Компания",
-            values="Баллы",
-            aggfunc="first",
-        )
-        result["rating_comparison"] = pivot
-    else:
-        result["rating_comparison"] = pd.DataFrame()
-
-    # Common customers (customers served by more than one of the compared companies)
+    return pivot_records_to_df(rows, index="Категория", values="scores", columns_name="Компания")
+
+
+async def _fetch_common_customers(pool: asyncpg.Pool, stirs: list[str]) -> pd.DataFrame:
+    """Customers served by more than one of the compared companies."""
     rows = await pool.fetch(
         """
         SELECT
@@ -91,27 +86,55 @@ async def compare_companies(
         """,
         stirs,
     )
-    result["common_customers"] = pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
+
 
-    # Tender activity comparison by month
+async def _fetch_monthly_comparison(pool: asyncpg.Pool, stirs: list[str]) -> pd.DataFrame:
+    """Tender activity comparison by month."""
     rows = await pool.fetch(
         """
         SELECT
             provider_stir                           AS "СТИР",
             c.canonical_name                        AS "Компания",
-            TO_CHAR(DATE_TRUNC('month', t.deal_date), 'YYYY-MM') AS "Месяц",
+            DATE_TRUNC('month', t.deal_date)::date  AS "Месяц",
             COUNT(*)                                AS "Тендеров",
             COALESCE(SUM(t.deal_cost), 0)           AS "Объём (UZS)"
         FROM tender_results t
         JOIN companies c ON t.provider_stir = c.stir
         WHERE t.provider_stir = ANY($1::varchar[])
           AND t.deal_date >= CURRENT_DATE - INTERVAL '12 months'
-        GROUP BY t.provider_stir, c.canonical_name, DATE_TRUNC('month', t.deal_date)
-        ORDER BY DATE_TRUNC('month', t.deal_date), t.provider_stir
+        GROUP BY t.provider_stir, c.canonical_name, 3
+        ORDER BY 3, t.provider_stir
         """,
         stirs,
     )
-    result["monthly_comparison"] = pd.DataFrame([dict(r) for r in rows])
+    return format_month(records_to_df(rows))
+
+
+async def compare_companies(
+    pool: asyncpg.Pool,
+    stirs: list[str],
+) -> dict[str, Any]:
+    """Side-by-side comparison of companies by STIRs.
+
+    The four result sets are independent, so they are fetched concurrently.
+    """
+    if not stirs or len(stirs) < 2:
+        logger.warning("Need at least 2 STIRs for comparison")
+        return {}
+
+    result: dict[str, Any] = {}
+    (
+        result["summary"],
+        result["rating_comparison"],
+        result["common_customers"],
+        result["monthly_comparison"],
+    ) = await asyncio.gather(
+        _fetch_summary(pool, stirs),
+        _fetch_rating_comparison(pool, stirs),
+        _fetch_common_customers(pool, stirs),
+        _fetch_monthly_comparison(pool, stirs),
+    )
 
     logger.info("Comparison fetched for {} companies", len(stirs))
     return result
@@ -0,0 +1,108 @@
+"""Helpers for turning asyncpg result sets into DataFrames."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from typing import Any
+
+import asyncpg
+import pandas as pd
+
+
+def _columnar_df(rows: Sequence[asyncpg.Record], columns: list[str]) -> pd.DataFrame:
+    """Assemble a frame column by column from Record values.
+
+    Each column is transposed out of the rows once and handed to pandas as
+    its own array, so no intermediate 2-D object array has to be split up
+    and re-inferred.  Column names must be unique.
+    """
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame(dict(zip(columns, zip(*rows))))
+
+
+def records_to_df(rows: Sequence[asyncpg.Record]) -> pd.DataFrame:
+    """Build a DataFrame straight from Records, without per-row dicts."""
+    if not rows:
+        return pd.DataFrame()
+    return _columnar_df(rows, list(rows[0].keys()))
+
+
+async def _statement_columns(conn: asyncpg.Connection, query: str) -> list[str]:
+    """Column names of ``query``, for headers on an empty result."""
+    stmt = await conn.prepare(query)
+    return [a.name for a in stmt.get_attributes()]
+
+
+async def fetch_df(pool: asyncpg.Pool, query: str, *args: Any) -> pd.DataFrame:
+    """Run a query and build a DataFrame; empty results keep their headers.
+
+    The query goes through the connection's statement cache; it is only
+    prepared separately (an extra round-trip) when no rows come back and
+    the column names must come from the statement.
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(query, *args)
+        if not rows:
+            return pd.DataFrame(columns=await _statement_columns(conn, query))
+    return _columnar_df(rows, list(rows[0].keys()))
+
+
+async def stream_df(
+    pool: asyncpg.Pool,
+    query: str,
+    *args: Any,
+    chunk_size: int = 500,
+) -> pd.DataFrame:
+    """Like :func:`fetch_df`, but read through a server-side cursor.
+
+    Rows arrive ``chunk_size`` at a time and are turned into frames as they
+    come, so the full Record list is never held at once.
+    """
+    chunks: list[pd.DataFrame] = []
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            cur = await conn.cursor(query, *args)
+            while batch := await cur.fetch(chunk_size):
+                chunks.append(_columnar_df(batch, list(batch[0].keys())))
+        if not chunks:
+            return pd.DataFrame(columns=await _statement_columns(conn, query))
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
+def round_fields(data: dict[str, Any], **digits: int) -> dict[str, Any]:
+    """Round scalar summary fields in place for display, leaving NULLs alone."""
+    for key, nd in digits.items():
+        if data.get(key) is not None:
+            data[key] = round(data[key], nd)
+    return data
+
+
+def format_month(df: pd.DataFrame, column: str = "Месяц") -> pd.DataFrame:
+    """Render a month-start date column as ``YYYY-MM`` labels, in place."""
+    if not df.empty:
+        df[column] = pd.to_datetime(df[column]).dt.strftime("%Y-%m")
+    return df
+
+
+def pivot_records_to_df(
+    rows: Sequence[asyncpg.Record],
+    index: str,
+    values: str,
+    columns_name: str | None = None,
+) -> pd.DataFrame:
+    """Build a wide DataFrame from rows of ``(index, jsonb_object_agg(...))``.
+
+    The server does the pivot; each row carries one index label and a JSON
+    object mapping column label → value.  Index and columns are sorted, as
+    ``pivot_table`` would.
+    """
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame.from_records(
+        [json.loads(r[values]) for r in rows],
+        index=pd.Index([r[index] for r in rows], name=index),
+    )
+    df.columns.name = columns_name
+    return df.sort_index().sort_index(axis=1)
@@ -8,90 +8,95 @@ import asyncpg
 import pandas as pd
 from loguru import logger
 
+from analysis.cache import async_ttl_cache
+from analysis.frames import format_month, pivot_records_to_df, records_to_df, round_fields
 from config import config
 
 # Shared SQL fragment: exclude non-contractor companies from competitor rankings.
-_CONTRACTOR_FILTER = (
-    "c.company_type NOT IN ("
-    + ", ".join(f"'{t}'" for t in config.excluded_company_types)
-    + ")"
+# The excluded types are bound as $2 (config.excluded_company_types), not
+# inlined, so the statement text never depends on configuration.
+_CONTRACTOR_FILTER = "NOT (c.company_type = ANY($2::text[]))"
+
+# Tashkent city + oblast, matched on the lower-cased generated column
+# tender_results.region_norm so the trigram index can serve the scan.
+_TASHKENT_FILTER = (
+    "t.region_norm LIKE ANY (ARRAY['%toshkent%', '%тошкент%', '%ташкент%'])"
 )
 
 
-async def get_market_summary(pool: asyncpg.Pool) -> dict[str, Any]:
-    """Overall construction tender market metrics."""
-    row = await pool.fetchrow("""
-        SELECT
-            COUNT(*) AS total_tenders,
-            COUNT(DISTINCT provider_stir) AS unique_winners,
-            COALESCE(SUM(deal_cost), 0)::bigint AS total_volume,
-            ROUND(AVG(deal_cost)::numeric, 0)::bigint AS avg_deal_size,
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            )::numeric, 2) AS avg_discount,
-            ROUND(AVG(participants_count)::numeric, 1) AS avg_participants,
-            MIN(deal_date) AS earliest_date,
-            MAX(deal_date) AS latest_date
-        FROM tender_results
-    """)
-    return dict(row) if row else {}
-
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
+async def get_market_summary_combined(pool: asyncpg.Pool) -> dict[str, dict[str, Any]]:
+    """All-time and last-12-months construction tender market metrics.
 
-async def get_market_summary_12m(pool: asyncpg.Pool) -> dict[str, Any]:
-    """Last 12 months construction tender market metrics."""
+    Both summaries come from one pass over ``tender_results``: the 12-month
+    figures are FILTER aggregates over the same scan.
+    """
     row = await pool.fetchrow("""
         SELECT
             COUNT(*) AS total_tenders,
             COUNT(DISTINCT provider_stir) AS unique_winners,
             COALESCE(SUM(deal_cost), 0)::bigint AS total_volume,
-            ROUND(AVG(deal_cost)::numeric, 0)::bigint AS avg_deal_size,
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            )::numeric, 2) AS avg_discount,
-            ROUND(AVG(participants_count)::numeric, 1) AS avg_participants
+            AVG(deal_cost)::bigint AS avg_deal_size,
+            AVG(discount_rate) AS avg_discount,
+            AVG(participants_count)::float8 AS avg_participants,
+            MIN(deal_date) AS earliest_date,
+            MAX(deal_date) AS latest_date,
+
+            COUNT(*) FILTER (WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months')
+                AS total_tenders_12m,
+            COUNT(DISTINCT provider_stir) FILTER (WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months')
+                AS unique_winners_12m,
+            COALESCE(SUM(deal_cost) FILTER (WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'), 0)::bigint
+                AS total_volume_12m,
+            (AVG(deal_cost) FILTER (WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'))::bigint
+                AS avg_deal_size_12m,
+            AVG(discount_rate) FILTER (WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months')
+                AS avg_discount_12m,
+            (AVG(participants_count) FILTER (WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'))::float8
+                AS avg_participants_12m
         FROM tender_results
-        WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'
     """)
-    return dict(row) if row else {}
+    if not row:
+        return {"all": {}, "last_12m": {}}
+    data = dict(row)
+    keys_12m = [k for k in data if k.endswith("_12m")]
+    last_12m = {k[:-len("_12m")]: data.pop(k) for k in keys_12m}
+    for summary in (data, last_12m):
+        round_fields(summary, avg_discount=2, avg_participants=1)
+    return {"all": data, "last_12m": last_12m}
 
 
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
 async def get_monthly_trend(pool: asyncpg.Pool) -> pd.DataFrame:
-    """Monthly tender volume and count (last 12 months)."""
+    """Monthly tender volume and count (last 12 months, from mv_tender_daily)."""
     rows = await pool.fetch("""
         SELECT
-            TO_CHAR(DATE_TRUNC('month', deal_date), 'YYYY-MM') AS "Месяц",
-            COUNT(*) AS "Тендеров",
-            SUM(deal_cost)::bigint AS "Объём (UZS)"
-        FROM tender_results
+            DATE_TRUNC('month', deal_date)::date AS "Месяц",
+            SUM(tenders)::bigint AS "Тендеров",
+            SUM(volume)::bigint AS "Объём (UZS)"
+        FROM mv_tender_daily
         WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'
-        GROUP BY DATE_TRUNC('month', deal_date)
-        ORDER BY DATE_TRUNC('month', deal_date)
+        GROUP BY 1
+        ORDER BY 1
     """)
-    return pd.DataFrame([dict(r) for r in rows])
+    return format_month(records_to_df(rows))
 
 
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
 async def get_regional_distribution(pool: asyncpg.Pool) -> pd.DataFrame:
-    """Tenders by region (last 12 months)."""
+    """Tenders by region (last 12 months, from mv_tender_daily)."""
     rows = await pool.fetch("""
         SELECT
-            COALESCE(region, 'Не определён') AS "Регион",
-            COUNT(*) AS "Тендеров",
-            SUM(deal_cost)::bigint AS "Объём (UZS)",
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            )::numeric, 2) AS "Ср. скидка %"
-        FROM tender_results
+            region AS "Регион",
+            SUM(tenders)::bigint AS "Тендеров",
+            SUM(volume)::bigint AS "Объём (UZS)",
+            SUM(discount_sum) / NULLIF(SUM(discount_count), 0) AS "Ср. скидка %"
+        FROM mv_tender_daily
         WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'
         GROUP BY region
-        ORDER BY SUM(deal_cost) DESC
+        ORDER BY SUM(volume) DESC
     """)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows).round({"Ср. скидка %": 2})
 
 
 async def get_top_customers(pool: asyncpg.Pool, limit: int = 10) -> pd.DataFrame:
@@ -101,45 +106,38 @@ async def get_top_customers(pool: asyncpg.Pool, limit: int = 10) -> pd.DataFrame
             customer_name AS "Заказчик",
             COUNT(*) AS "Тендеров",
             SUM(deal_cost)::bigint AS "Объём (UZS)",
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            )::numeric, 2) AS "Ср. скидка %"
+            AVG(discount_rate) AS "Ср. скидка %"
         FROM tender_results
         WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'
         GROUP BY customer_name
         ORDER BY SUM(deal_cost) DESC
         LIMIT $1
     """, limit)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows).round({"Ср. скидка %": 2})
 
 
 async def get_tashkent_customers(pool: asyncpg.Pool, limit: int = 10) -> pd.DataFrame:
     """Biggest construction buyers in Tashkent (last 12 months)."""
-    rows = await pool.fetch("""
+    rows = await pool.fetch(f"""
         SELECT
             customer_name AS "Заказчик",
             COUNT(*) AS "Тендеров",
             SUM(deal_cost)::bigint AS "Объём (UZS)",
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            )::numeric, 2) AS "Ср. скидка %"
-        FROM tender_results
+            AVG(discount_rate) AS "Ср. скидка %"
+        FROM tender_results t
         WHERE deal_date >= CURRENT_DATE - INTERVAL '12 months'
-          AND (region ILIKE '%toshkent%' OR region ILIKE '%тошкент%' OR region ILIKE '%ташкент%')
+          AND {_TASHKENT_FILTER}
         GROUP BY customer_name
         ORDER BY SUM(deal_cost) DESC
         LIMIT $1
     """, limit)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows).round({"Ср. скидка %": 2})
 
 
 # ── UET-specific queries ──────────────────────────────────
 
 
+@async_ttl_cache(ttl=config.analysis_stir_cache_ttl, maxsize=1024)
 async def get_uet_profile(pool: asyncpg.Pool, stir: str) -> dict[str, Any]:
     """Full UET company data."""
     row = await pool.fetchrow("""
@@ -156,30 +154,32 @@ async def get_uet_rating_percentile(pool: asyncpg.Pool, score: float) -> dict[st
     """How UET ranks among all rated companies."""
     row = await pool.fetchrow("""
         SELECT
-            (SELECT COUNT(*) FROM companies WHERE rating_score IS NOT NULL) AS total_rated,
-            (SELECT COUNT(*) FROM companies WHERE rating_score IS NOT NULL AND rating_score >= $1) AS at_or_above,
-            (SELECT COUNT(*) FROM companies WHERE rating_score IS NOT NULL AND rating_score > $1) AS strictly_above
+            COUNT(*) AS total_rated,
+            COUNT(*) FILTER (WHERE rating_score >= $1) AS at_or_above,
+            COUNT(*) FILTER (WHERE rating_score > $1) AS strictly_above
+        FROM companies
+        WHERE rating_score IS NOT NULL
     """, score)
     return dict(row) if row else {}
 
 
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
 async def get_rating_distribution(pool: asyncpg.Pool) -> pd.DataFrame:
-    """How many companies per rating letter."""
+    """How many companies per rating letter (from mv_rating_distribution)."""
     rows = await pool.fetch("""
         SELECT
             rating_letter AS "Рейтинг",
-            COUNT(*) AS "Компаний",
-            ROUND(AVG(rating_score)::numeric, 2) AS "Ср. балл",
-            MIN(rating_score) AS "Мин.",
-            MAX(rating_score) AS "Макс."
-        FROM companies
-        WHERE rating_letter IS NOT NULL
-        GROUP BY rating_letter
-        ORDER BY AVG(rating_score) DESC
+            company_count AS "Компаний",
+            avg_score AS "Ср. балл",
+            min_score AS "Мин.",
+            max_score AS "Макс."
+        FROM mv_rating_distribution
+        ORDER BY avg_score DESC
     """)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
 
 
+@async_ttl_cache(ttl=config.analysis_stir_cache_ttl, maxsize=1024)
 async def get_uet_rating_breakdown(pool: asyncpg.Pool, stir: str) -> pd.DataFrame:
     """UET's earned vs max points by category."""
     rows = await pool.fetch("""
@@ -195,34 +195,25 @@ async def get_uet_rating_breakdown(pool: asyncpg.Pool, stir: str) -> pd.DataFram
         GROUP BY rc.id, rc.name_ru, rc.display_order
         ORDER BY rc.display_order
     """, stir)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
 
 
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
 async def get_top50_benchmark(pool: asyncpg.Pool) -> pd.DataFrame:
-    """Average scores by category for top 50 rated companies (benchmark)."""
+    """Average scores by category for top 50 rated companies (from mv_top50_benchmark)."""
     rows = await pool.fetch("""
         SELECT
-            rc.name_ru AS "Категория",
-            ROUND(AVG(cat_sum.earned)::numeric, 2) AS "Топ-50 ср. баллы",
-            ROUND(AVG(cat_sum.max_pts)::numeric, 2) AS "Макс. баллы",
-            ROUND(AVG(cat_sum.earned / NULLIF(cat_sum.max_pts, 0) * 100)::numeric, 1) AS "Топ-50 %"
-        FROM (
-            SELECT cr.company_stir, rk.category_id,
-                   SUM(cr.earned_points) AS earned, SUM(cr.max_points) AS max_pts
-            FROM company_ratings cr
-            JOIN rating_criteria rk ON cr.criterion_id = rk.id
-            WHERE cr.company_stir IN (
-                SELECT stir FROM companies ORDER BY rating_score DESC NULLS LAST LIMIT 50
-            )
-            GROUP BY cr.company_stir, rk.category_id
-        ) cat_sum
-        JOIN rating_categories rc ON cat_sum.category_id = rc.id
-        GROUP BY rc.id, rc.name_ru, rc.display_order
-        ORDER BY rc.display_order
+            name_ru AS "Категория",
+            avg_earned AS "Топ-50 ср. баллы",
+            avg_max AS "Макс. баллы",
+            avg_pct AS "Топ-50 %"
+        FROM mv_top50_benchmark
+        ORDER BY display_order
     """)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
 
 
+@async_ttl_cache(ttl=config.analysis_stir_cache_ttl, maxsize=1024)
 async def get_uet_rating_detail(pool: asyncpg.Pool, stir: str) -> pd.DataFrame:
     """All individual indicators for UET."""
     rows = await pool.fetch("""
@@ -238,7 +229,7 @@ async def get_uet_rating_detail(pool: asyncpg.Pool, stir: str) -> pd.DataFrame:
         WHERE cr.company_stir = $1
         ORDER BY rc.display_order, cr.max_points DESC NULLS LAST
     """, stir)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
 
 
 # ── Competitor analysis ───────────────────────────────────
@@ -255,27 +246,23 @@ async def get_tashkent_competitors(pool: asyncpg.Pool, limit: int = 15) -> pd.Da
             COUNT(t.deal_id) AS "Побед (Ташкент)",
             SUM(t.deal_cost)::bigint AS "Объём (UZS)",
             c.employee_count AS "Сотрудники",
-            ROUND(AVG(
-                CASE WHEN t.start_cost > 0
-                     THEN (t.start_cost - t.deal_cost) / t.start_cost * 100
-                     ELSE 0
-                END
-            )::numeric, 2) AS "Ср. скидка %"
+            -- Tenders without a start price count as 0%, as they always have
+            AVG(CASE WHEN t.start_cost > 0 THEN t.discount_rate ELSE 0 END) AS "Ср. скидка %"
         FROM companies c
         JOIN tender_results t ON c.stir = t.provider_stir
-        WHERE (t.region ILIKE '%toshkent%' OR t.region ILIKE '%тошкент%'
-              OR t.region ILIKE '%ташкент%')
+        WHERE {_TASHKENT_FILTER}
           AND {_CONTRACTOR_FILTER}
         GROUP BY c.stir, c.canonical_name, c.rating_letter, c.rating_score,
                  c.employee_count
         ORDER BY COUNT(t.deal_id) DESC
         LIMIT $1
-    """, limit)
-    return pd.DataFrame([dict(r) for r in rows])
+    """, limit, config.excluded_company_types)
+    return records_to_df(rows).round({"Ср. скидка %": 2})
 
 
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
 async def get_top_companies_overall(pool: asyncpg.Pool, limit: int = 15) -> pd.DataFrame:
-    """Top N companies nationally by tender wins (last 12 months)."""
+    """Top N companies nationally by tender wins (from mv_top_companies_overall)."""
     rows = await pool.fetch(f"""
         SELECT
             ROW_NUMBER() OVER (ORDER BY c.total_wins DESC) AS "№",
@@ -288,13 +275,12 @@ async def get_top_companies_overall(pool: asyncpg.Pool, limit: int = 15) -> pd.D
             c.total_contract_value::bigint AS "Объём (UZS)",
             c.avg_discount_pct AS "Ср. скидка %",
             c.employee_count AS "Сотрудники"
-        FROM companies c
-        WHERE c.total_wins > 0
-          AND {_CONTRACTOR_FILTER}
+        FROM mv_top_companies_overall c
+        WHERE {_CONTRACTOR_FILTER}
         ORDER BY c.total_wins DESC
         LIMIT $1
-    """, limit)
-    return pd.DataFrame([dict(r) for r in rows])
+    """, limit, config.excluded_company_types)
+    return records_to_df(rows)
 
 
 async def get_peer_comparison(
@@ -316,39 +302,37 @@ async def get_peer_comparison(
             c.avg_discount_pct AS "Ср. скидка %",
             c.employee_count AS "Сотрудники",
             c.specialist_count AS "Специалисты"
-        FROM companies c
-        WHERE c.stir = ANY($1)
-        ORDER BY array_position($1, c.stir)
+        FROM unnest($1::varchar[]) WITH ORDINALITY AS ord(stir, ord_no)
+        JOIN companies c ON c.stir = ord.stir
+        ORDER BY ord.ord_no
     """, all_stirs)
-    return pd.DataFrame([dict(r) for r in rows])
+    return records_to_df(rows)
 
 
 async def get_peer_rating_comparison(
     pool: asyncpg.Pool,
     stirs: list[str],
 ) -> pd.DataFrame:
-    """Rating category comparison across companies."""
+    """Rating category comparison across companies (category × company, pivoted in SQL)."""
     rows = await pool.fetch("""
         SELECT
-            c.canonical_name AS company,
-            rc.name_ru AS category,
-            ROUND(SUM(cr.earned_points)::numeric, 2) AS earned,
-            ROUND(SUM(cr.max_points)::numeric, 2) AS max_pts
-        FROM company_ratings cr
-        JOIN rating_criteria rk ON cr.criterion_id = rk.id
-        JOIN rating_categories rc ON rk.category_id = rc.id
-        JOIN companies c ON cr.company_stir = c.stir
-        WHERE cr.company_stir = ANY($1)
-        GROUP BY c.canonical_name, rc.id, rc.name_ru, rc.display_order
-        ORDER BY rc.display_order, c.canonical_name
+            category,
+            jsonb_object_agg(company, earned) AS scores
+        FROM (
+            SELECT
+                c.canonical_name AS company,
+                rc.name_ru AS category,
+                ROUND(SUM(cr.earned_points)::numeric, 2) AS earned
+            FROM company_ratings cr
+            JOIN rating_criteria rk ON cr.criterion_id = rk.id
+            JOIN rating_categories rc ON rk.category_id = rc.id
+            JOIN companies c ON cr.company_stir = c.stir
+            WHERE cr.company_stir = ANY($1)
+            GROUP BY c.canonical_name, rc.name_ru
+        ) per_company
+        GROUP BY category
     """, stirs)
-    if not rows:
-        return pd.DataFrame()
-    df = pd.DataFrame([dict(r) for r in rows])
-    pivot = df.pivot_table(
-        index="category", columns="company", values="earned", aggfunc="sum"
-    )
-    return pivot
+    return pivot_records_to_df(rows, index="category", values="scores", columns_name="company")
 
 
 # ── Opportunities ─────────────────────────────────────────
@@ -356,11 +340,11 @@ async def get_peer_rating_comparison(
 
 async def get_big_tashkent_tenders(pool: asyncpg.Pool, limit: int = 15) -> pd.DataFrame:
     """Biggest recent Tashkent tenders — opportunities UET missed."""
-    rows = await pool.fetch("""
+    rows = await pool.fetch(f"""
         SELECT
             t.deal_date AS "Дата",
             t.customer_name AS "Заказчик",
-            t.deal_description AS "Описание",
+            LEFT(t.deal_description, 120) AS "Описание",
             t.start_cost::bigint AS "Нач. цена (UZS)",
             t.deal_cost::bigint AS "Цена контракта (UZS)",
             t.provider_name AS "Победитель",
@@ -368,17 +352,13 @@ async def get_big_tashkent_tenders(pool: asyncpg.Pool, limit: int = 15) -> pd.Da
             t.participants_count AS "Участники"
         FROM tender_results t
         LEFT JOIN companies c ON t.provider_stir = c.stir
-        WHERE (t.region ILIKE '%toshkent%' OR t.region ILIKE '%тошкент%'
-               OR t.region ILIKE '%ташкент%')
+        WHERE {_TASHKENT_FILTER}
           AND t.deal_date >= CURRENT_DATE - INTERVAL '6 months'
           AND t.deal_cost > 500000000
         ORDER BY t.deal_cost DESC
         LIMIT $1
     """, limit)
-    df = pd.DataFrame([dict(r) for r in rows])
-    if not df.empty and "Описание" in df.columns:
-        df["Описание"] = df["Описание"].str[:120]
-    return df
+    return records_to_df(rows)
 
 
 async def get_high_rated_without_etender(pool: asyncpg.Pool) -> dict[str, Any]:
@@ -396,11 +376,19 @@ async def get_high_rated_without_etender(pool: asyncpg.Pool) -> dict[str, Any]:
     return {r["letter"]: {"total": r["total"], "with_etender": r["with_etender"]} for r in rows}
 
 
-async def get_uet_competitiveness_gaps(pool: asyncpg.Pool, stir: str) -> pd.DataFrame:
-    """Specific competitiveness indicators where UET scores 0 but could improve."""
+@async_ttl_cache(ttl=config.analysis_stir_cache_ttl, maxsize=1024)
+async def get_uet_competitiveness_gaps(
+    pool: asyncpg.Pool,
+    stir: str,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """Specific competitiveness indicators where UET scores 0 but could improve.
+
+    ``limit`` keeps only the indicators with the most potential (None = all).
+    """
     rows = await pool.fetch("""
         SELECT
-            rk.name_uz AS "Показатель",
+            LEFT(rk.name_uz, 80) AS "Показатель",
             cr.raw_value AS "Текущее значение",
             cr.earned_points AS "Текущие баллы",
             cr.max_points AS "Макс. баллы",
@@ -412,9 +400,6 @@ async def get_uet_competitiveness_gaps(pool: asyncpg.Pool, stir: str) -> pd.Data
           AND rc.code = 'competitiveness'
           AND cr.max_points > 0
         ORDER BY (cr.max_points - COALESCE(cr.earned_points, 0)) DESC
-    """, stir)
-    df = pd.DataFrame([dict(r) for r in rows])
-    # Truncate long indicator names in Python (safe for multi-byte)
-    if not df.empty and "Показатель" in df.columns:
-        df["Показатель"] = df["Показатель"].str[:80]
-    return df
+        LIMIT $2
+    """, stir, limit)
+    return records_to_df(rows)
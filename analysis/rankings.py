@@ -2,33 +2,43 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 import asyncpg
 import pandas as pd
 from loguru import logger
 
+from analysis.cache import async_ttl_cache
+from analysis.frames import (
+    fetch_df,
+    format_month,
+    round_fields,
+    stream_df,
+)
 from config import config
 
 # Shared SQL fragment for excluding non-contractor companies from rankings.
 # Deals still count toward market volume — only company-level rankings filter.
-_CONTRACTOR_FILTER = (
-    "c.company_type NOT IN ("
-    + ", ".join(f"'{t}'" for t in config.excluded_company_types)
-    + ")"
-)
+# The excluded types are bound as $2 (config.excluded_company_types), not
+# inlined, so the statement text never depends on configuration.
+_CONTRACTOR_FILTER = "NOT (c.company_type = ANY($2::text[]))"
 
+# Search results above this many rows are streamed through a cursor
+_SEARCH_STREAM_THRESHOLD = 500
 
+
+@async_ttl_cache(ttl=config.analysis_cache_ttl)
 async def get_top_companies(
     pool: asyncpg.Pool,
     limit: int = 15,
     lookback_months: int = 12,
 ) -> pd.DataFrame:
     """Top N companies ranked by tender wins in the lookback period."""
-    rows = await pool.fetch(
+    df = await fetch_df(
+        pool,
         f"""
         SELECT
-            ROW_NUMBER() OVER (ORDER BY c.total_wins DESC)  AS "№",
             c.canonical_name   AS "Компания",
             c.stir             AS "СТИР",
             c.region           AS "Регион",
@@ -45,25 +55,15 @@ async def get_top_companies(
         LIMIT $1
         """,
         limit,
+        config.excluded_company_types,
     )
-    df = pd.DataFrame([dict(r) for r in rows])
+    df.insert(0, "№", range(1, len(df) + 1))
     logger.info("Top {} companies fetched ({} rows)", limit, len(df))
     return df
 
 
-async def get_market_overview(
-    pool: asyncpg.Pool,
-    lookback_months: int = 12,
-) -> dict[str, Any]:
-    """Market summary metrics, regional distribution, and monthly trends.
-
-    Note: Market volume metrics include ALL deals (including non-contractors),
-    because the deals themselves are real construction tenders. The filter
-    only applies to company-level rankings.
-    """
-    result: dict[str, Any] = {}
-
-    # Overall metrics (no company filter — total market size)
+async def _overview_summary(pool: asyncpg.Pool, lookback_months: int) -> dict[str, Any]:
+    """Overall metrics (no company filter — total market size)."""
     row = await pool.fetchrow(
         """
         SELECT
@@ -71,58 +71,63 @@ async def get_market_overview(
             COUNT(DISTINCT provider_stir)   AS unique_winners,
             COALESCE(SUM(deal_cost), 0)     AS total_volume,
             COALESCE(AVG(deal_cost), 0)     AS avg_contract,
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            ), 2)                           AS avg_discount,
-            ROUND(AVG(participants_count)::numeric, 1) AS avg_participants
+            AVG(discount_rate)              AS avg_discount,
+            AVG(participants_count)::float8 AS avg_participants
         FROM tender_results
         WHERE deal_date >= CURRENT_DATE - make_interval(months => $1)
         """,
         lookback_months,
     )
-    result["summary"] = dict(row) if row else {}
+    return round_fields(dict(row) if row else {}, avg_discount=2, avg_participants=1)
 
-    # Regional distribution (no company filter)
+
+async def _overview_rollups(
+    pool: asyncpg.Pool,
+    lookback_months: int,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Regional and monthly breakdowns from the mv_tender_daily rollup.
+
+    GROUPING SETS emits one row per region and one per month in a single
+    pass; ``by_month`` says which set a row belongs to.
+    """
     rows = await pool.fetch(
         """
         SELECT
-            COALESCE(region, 'Не определён') AS "Регион",
-            COUNT(*)                          AS "Тендеров",
-            COALESCE(SUM(deal_cost), 0)       AS "Объём (UZS)",
-            ROUND(AVG(
-                CASE WHEN start_cost > 0
-                     THEN (start_cost - deal_cost) / start_cost * 100
-                END
-            ), 2)                             AS "Ср. скидка %"
-        FROM tender_results
+            GROUPING(region) = 1                          AS by_month,
+            region,
+            DATE_TRUNC('month', deal_date)::date          AS month,
+            SUM(tenders)::bigint                          AS tenders,
+            SUM(volume)                                   AS volume,
+            SUM(discount_sum) / NULLIF(SUM(discount_count), 0) AS avg_discount
+        FROM mv_tender_daily
         WHERE deal_date >= CURRENT_DATE - make_interval(months => $1)
-        GROUP BY region
-        ORDER BY SUM(deal_cost) DESC
+        GROUP BY GROUPING SETS ((region), (DATE_TRUNC('month', deal_date)::date))
+        ORDER BY by_month, month, SUM(volume) DESC
         """,
         lookback_months,
     )
-    result["by_region"] = pd.DataFrame([dict(r) for r in rows])
 
-    # Monthly trend (no company filter)
-    rows = await pool.fetch(
-        """
-        SELECT
-            TO_CHAR(DATE_TRUNC('month', deal_date), 'YYYY-MM') AS "Месяц",
-            COUNT(*)                      AS "Тендеров",
-            COALESCE(SUM(deal_cost), 0)   AS "Объём (UZS)"
-        FROM tender_results
-        WHERE deal_date >= CURRENT_DATE - make_interval(months => $1)
-        GROUP BY DATE_TRUNC('month', deal_date)
-        ORDER BY DATE_TRUNC('month', deal_date)
-        """,
-        lookback_months,
+    regions: list[tuple[Any, ...]] = []
+    months: list[tuple[Any, ...]] = []
+    for r in rows:
+        if r["by_month"]:
+            months.append((r["month"], r["tenders"], r["volume"]))
+        else:
+            regions.append((r["region"], r["tenders"], r["volume"], r["avg_discount"]))
+
+    by_region = pd.DataFrame.from_records(
+        regions, columns=["Регион", "Тендеров", "Объём (UZS)", "Ср. скидка %"],
+    ).round({"Ср. скидка %": 2})
+    monthly_trend = format_month(
+        pd.DataFrame.from_records(months, columns=["Месяц", "Тендеров", "Объём (UZS)"])
     )
-    result["monthly_trend"] = pd.DataFrame([dict(r) for r in rows])
+    return by_region, monthly_trend
 
-    # Top 10 customers (no company filter)
-    rows = await pool.fetch(
+
+async def _overview_top_customers(pool: asyncpg.Pool, lookback_months: int) -> pd.DataFrame:
+    """Top 10 customers (no company filter)."""
+    return await fetch_df(
+        pool,
         """
         SELECT
             customer_name                 AS "Заказчик",
@@ -136,10 +141,35 @@ async def get_market_overview(
         """,
         lookback_months,
     )
-    result["top_customers"] = pd.DataFrame([dict(r) for r in rows])
 
+
+@async_ttl_cache(ttl=config.analysis_cache_ttl, maxsize=8)
+async def get_market_overview(
+    pool: asyncpg.Pool,
+    lookback_months: int = 12,
+) -> dict[str, Any]:
+    """Market summary metrics, regional distribution, and monthly trends.
+
+    Note: Market volume metrics include ALL deals (including non-contractors),
+    because the deals themselves are real construction tenders. The filter
+    only applies to company-level rankings.
+
+    Regions and months come from the mv_tender_daily rollup in one grouped
+    query; the summary (distinct winners cannot be rolled up) and top
+    customers scan tender_results.  All three run concurrently.
+    """
+    summary, (by_region, monthly_trend), top_customers = await asyncio.gather(
+        _overview_summary(pool, lookback_months),
+        _overview_rollups(pool, lookback_months),
+        _overview_top_customers(pool, lookback_months),
+    )
     logger.info("Market overview fetched")
-    return result
+    return {
+        "summary": summary,
+        "by_region": by_region,
+        "monthly_trend": monthly_trend,
+        "top_customers": top_customers,
+    }
 
 
 async def get_company_position(
@@ -149,29 +179,13 @@ async def get_company_position(
     """Show where a company ranks among all contractors.
 
     Excludes non-contractor companies (labs, assessors, consultants)
-    from the ranking pool so positions are meaningful.
+    from the ranking pool so positions are meaningful.  Ranks come from
+    mv_company_ranks, refreshed by the enrichment pipeline over the
+    configured excluded company types.
     """
-    rows = await pool.fetch(
-        f"""
-        WITH ranked AS (
-            SELECT
-                stir,
-                canonical_name,
-                region,
-                rating_letter,
-                total_wins,
-                total_contract_value,
-                rating_score,
-                avg_discount_pct,
-                employee_count,
-                RANK() OVER (ORDER BY total_wins DESC)                     AS rank_wins,
-                RANK() OVER (ORDER BY total_contract_value DESC)           AS rank_volume,
-                RANK() OVER (ORDER BY rating_score DESC NULLS LAST)        AS rank_rating,
-                COUNT(*) OVER ()                                           AS total_companies
-            FROM companies c
-            WHERE (total_wins > 0 OR rating_score IS NOT NULL)
-              AND {_CONTRACTOR_FILTER}
-        )
+    df = await fetch_df(
+        pool,
+        """
         SELECT
             canonical_name       AS "Компания",
             stir                 AS "СТИР",
@@ -184,14 +198,13 @@ async def get_company_position(
             total_contract_value AS "Объём (UZS)",
             rank_volume          AS "Место (объём)",
             total_companies      AS "Всего компаний"
-        FROM ranked
+        FROM mv_company_ranks
         WHERE stir = $1
            OR rank_wins <= 10
         ORDER BY rank_wins
         """,
         stir,
     )
-    df = pd.DataFrame([dict(r) for r in rows])
     logger.info("Position report for STIR {}: {} rows", stir, len(df))
     return df
 
@@ -202,17 +215,53 @@ async def find_company_by_name(
     limit: int = 10,
 ) -> pd.DataFrame:
     """Fuzzy search for companies by name. Shows company_type for transparency."""
-    rows = await pool.fetch(
-        """
+    query = """
         SELECT stir, canonical_name, company_type, total_wins,
                total_contract_value, rating_letter
         FROM companies
-        WHERE canonical_name ILIKE $1
-           OR raw_names::text ILIKE $1
+        WHERE canonical_name ILIKE '%' || $1 || '%'
+           OR raw_names_text ILIKE '%' || $1 || '%'
         ORDER BY total_wins DESC
         LIMIT $2
+    """
+    fetch = stream_df if limit > _SEARCH_STREAM_THRESHOLD else fetch_df
+    return await fetch(pool, query, search, limit)
+
+
+async def find_companies_by_names(
+    pool: asyncpg.Pool,
+    searches: list[str],
+    limit_each: int = 10,
+) -> dict[str, pd.DataFrame]:
+    """Run several name searches in one round-trip, keyed by search term.
+
+    Same matching and ordering as :func:`find_company_by_name`, applied to
+    each term through a LATERAL join over ``unnest($1)``.  Repeated terms
+    are searched once.
+    """
+    # A repeated term would get two LATERAL result sets, merged by groupby
+    searches = list(dict.fromkeys(searches))
+    df = await fetch_df(
+        pool,
+        """
+        SELECT s.term, m.stir, m.canonical_name, m.company_type, m.total_wins,
+               m.total_contract_value, m.rating_letter
+        FROM unnest($1::text[]) WITH ORDINALITY AS s(term, ord)
+        CROSS JOIN LATERAL (
+            SELECT stir, canonical_name, company_type, total_wins,
+                   total_contract_value, rating_letter
+            FROM companies
+            WHERE canonical_name ILIKE '%' || s.term || '%'
+               OR raw_names_text ILIKE '%' || s.term || '%'
+            ORDER BY total_wins DESC
+            LIMIT $2
+        ) m
+        ORDER BY s.ord, m.total_wins DESC
         """,
-        f"%{search}%",
-        limit,
+        searches,
+        limit_each,
     )
-    return pd.DataFrame([dict(r) for r in rows])
+    groups = {term: g.drop(columns="term").reset_index(drop=True)
+              for term, g in df.groupby("term", sort=False)}
+    empty = df.drop(columns="term").iloc[0:0]
+    return {term: groups.get(term, empty) for term in searches}
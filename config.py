@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
-from pydantic_settings import BaseSettings
+import re
+from collections.abc import Iterable
+from functools import cached_property
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Config(BaseSettings):
@@ -15,6 +19,22 @@ class Config(BaseSettings):
     db_user: str = "postgres"
     db_password: str = "postgres"
 
+    # ── Connection pool ───────────────────────────────────────
+    # max_size must cover the widest asyncio.gather fan-out (report sheets,
+    # profile/comparison queries) so concurrent queries don't queue on acquire.
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 20
+    db_max_inactive_connection_lifetime: float = 300.0
+    db_command_timeout: float = 60.0
+    # asyncpg keeps a per-connection LRU of prepared statements keyed by SQL
+    # text; sized to hold every analysis/scraper query so repeat calls skip
+    # parse/plan and go straight to Bind/Execute.
+    db_statement_cache_size: int = 1024
+    db_max_cached_statement_lifetime: int = 600
+    # asyncpg skips caching statements longer than this (default 15 KiB);
+    # the profile/overview queries are long single statements.
+    db_max_cacheable_statement_size: int = 64 * 1024
+
     @property
     def dsn(self) -> str:
         return (
@@ -22,10 +42,14 @@ class Config(BaseSettings):
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    # ── Analysis query cache (seconds) ────────────────────────
+    analysis_cache_ttl: int = 300       # market-wide aggregates
+    analysis_stir_cache_ttl: int = 60   # per-company lookups
+
     # ── ETender API ───────────────────────────────────────────
     etender_api_url: str = "https://apietender.uzex.uz/api/common/DealsList"
-    etender_concurrency: int = 5
-    etender_batch_delay: float = 0.5
+    etender_concurrency: int = 5        # page fetches in flight
+    etender_batch_delay: float = 0.5    # paced over each etender_concurrency page starts
 
     # ── Reyting ───────────────────────────────────────────────
     reyting_api_base: str = "https://japi-reyting.mc.uz"
@@ -35,11 +59,15 @@ class Config(BaseSettings):
 
     # ── HTTP defaults ─────────────────────────────────────────
     http_timeout: int = 30
+    http2: bool = True                  # multiplex concurrent requests per host
+    http_max_connections: int = 20      # covers etender/reyting concurrency
+    http_keepalive_expiry: float = 30.0
     max_retries: int = 3
+    http_max_retry_after: float = 300.0  # cap on a server's 429 Retry-After (s)
     user_agent: str = "Mozilla/5.0 (compatible; MarketIntel/1.0)"
 
     # ── Construction keyword filter ───────────────────────────
-    construction_keywords: list[str] = [
+    construction_keywords: tuple[str, ...] = (
         # Core
         "qurilish", "строительств", "ta'mir", "tamir", "ta'mirlash", "ремонт",
         # Infrastructure objects
@@ -54,12 +82,12 @@ class Config(BaseSettings):
         "перекладк", "благоустройств", "трансформатор",
         # Uzbek extras
         "o'rnatish",
-    ]
+    )
 
     # ── Non-construction deal filter (Tier 2 negative) ──────
     # Categories that are obviously NOT construction — used to reject
     # false positives when a deal matches only via customer/provider name.
-    non_construction_keywords: list[str] = [
+    non_construction_keywords: tuple[str, ...] = (
         # Food/catering
         "питан", "овқатлантириш", "catering", "ошхона",
         # IT/office equipment
@@ -72,12 +100,12 @@ class Config(BaseSettings):
         "мебел", "канцеляр",
         # Fuel
         "топлив", "ёнилғи", "бензин",
-    ]
+    )
 
     # ── Non-contractor company filter ────────────────────────
     # Companies matching these in their name are NOT construction contractors.
     # They participate in construction tenders as assessors/labs/consultants.
-    non_contractor_keywords: list[str] = [
+    non_contractor_keywords: tuple[str, ...] = (
         # Uzbek
         "baholash", "baho", "sinov", "laboratoriya", "ekspertiza", "ekspert",
         "konsalting", "tekshirish", "nazorat", "sertifikat", "standart", "metrologiya",
@@ -88,14 +116,14 @@ class Config(BaseSettings):
         # English (some companies use English names)
         "consulting", "assessment", "laboratory", "evaluation", "inspection",
         "certification", "expertise", "audit", "monitoring",
-    ]
+    )
 
     # Company types to exclude from competitor rankings.
     # Deals from these companies still count toward market volume totals.
-    excluded_company_types: list[str] = ["consultant", "laboratory", "assessor", "other"]
+    excluded_company_types: frozenset[str] = frozenset({"consultant", "laboratory", "assessor", "other"})
 
     # ── Uzbekistan regions (for extraction from text) ─────────
-    regions: list[str] = [
+    regions: tuple[str, ...] = (
         "Тошкент шахар", "Тошкент вилояти",
         "Самарқанд", "Бухоро", "Фарғона",
         "Андижон", "Наманган", "Қашқадарё",
@@ -106,7 +134,7 @@ class Config(BaseSettings):
         "Andijon", "Namangan", "Qashqadaryo",
         "Surxondaryo", "Jizzax", "Sirdaryo",
         "Navoiy", "Xorazm", "Qoraqalpog'iston",
-    ]
+    )
 
     # Normalization: map all variant spellings → single canonical Cyrillic name.
     # Used by enrichment to merge duplicates (e.g., "Toshkent" + "Тошкент шахар").
@@ -181,7 +209,44 @@ class Config(BaseSettings):
         "Angren": "Тошкент вилояти",
     }
 
-    model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
+    # ── Compiled matchers (built once from the lists above) ───
+    # One alternation per list, so a text is scanned once instead of once
+    # per keyword.  Match against lower-cased text.
+
+    @cached_property
+    def construction_re(self) -> re.Pattern[str]:
+        return _alternation(self.construction_keywords)
+
+    @cached_property
+    def non_construction_re(self) -> re.Pattern[str]:
+        return _alternation(self.non_construction_keywords)
+
+    @cached_property
+    def region_re(self) -> re.Pattern[str]:
+        return _alternation(self.regions)
+
+    @cached_property
+    def region_text_patterns(self) -> tuple[list[str], list[str]]:
+        """``%pattern%`` ILIKE strings and their canonical regions, in priority order.
+
+        Region names first, then normalization variants and district
+        names; a later duplicate updates the canonical but keeps the
+        earlier position.
+        """
+        patterns = {r: self.region_normalization.get(r, r) for r in self.regions}
+        patterns.update(self.region_normalization)
+        patterns.update(self.district_to_region)
+        return [f"%{p}%" for p in patterns], list(patterns.values())
+
+    # Frozen: one process-wide instance, shared read-only by every module
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
+
+
+def _alternation(words: Iterable[str]) -> re.Pattern[str]:
+    """Compile lower-cased literal words into one ``a|b|c`` pattern."""
+    # Longest first, so a word is never shadowed by one of its own prefixes
+    ordered = sorted({w.lower() for w in words}, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, ordered)))
 
 
 config = Config()
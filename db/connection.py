@@ -1,4 +1,20 @@
-"""Asyncpg connection pool management."""
+"""Asyncpg connection pool management.
+
+The pool is shared by scrapers, enrichment and analysis, so it stays
+read-write.  It is sized for the analysis fan-out (several queries per
+report section run concurrently via ``asyncio.gather``), and JIT is
+disabled per session: the analytic queries here are short, and JIT
+compilation routinely costs more than it saves on them.
+
+NUMERIC is decoded to ``float`` rather than ``Decimal``: every consumer
+is a report, and pandas then lands those columns as float64 directly.
+Parameters are still sent as text, so ``Decimal`` inputs keep full
+precision on the way in.
+
+JSONB goes over the binary protocol: the scrapers hand over UTF-8 bytes
+from orjson, which are framed and sent without a str round-trip.  Values
+read back are still plain ``str`` for the analysis code to parse.
+"""
 
 from __future__ import annotations
 
@@ -10,6 +26,31 @@ from config import config
 _pool: asyncpg.Pool | None = None
 
 
+# Binary jsonb is the JSON text behind a one-byte format version
+_JSONB_VERSION = b"\x01"
+
+
+def _encode_jsonb(value: bytes | str) -> bytes:
+    if isinstance(value, str):
+        value = value.encode()
+    return _JSONB_VERSION + value
+
+
+def _decode_jsonb(data: bytes) -> str:
+    return data[1:].decode()
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Per-connection setup: decode NUMERIC as float, pass JSONB as bytes."""
+    await conn.set_type_codec(
+        "numeric", encoder=str, decoder=float, schema="pg_catalog", format="text",
+    )
+    await conn.set_type_codec(
+        "jsonb", encoder=_encode_jsonb, decoder=_decode_jsonb,
+        schema="pg_catalog", format="binary",
+    )
+
+
 async def get_pool() -> asyncpg.Pool:
     """Return (and lazily create) the shared connection pool."""
     global _pool
@@ -17,16 +58,49 @@ async def get_pool() -> asyncpg.Pool:
         logger.info("Creating asyncpg pool → {}", config.dsn)
         _pool = await asyncpg.create_pool(
             dsn=config.dsn,
-            min_size=2,
-            max_size=10,
+            min_size=config.db_pool_min_size,
+            max_size=config.db_pool_max_size,
+            max_inactive_connection_lifetime=config.db_max_inactive_connection_lifetime,
+            command_timeout=config.db_command_timeout,
+            statement_cache_size=config.db_statement_cache_size,
+            max_cached_statement_lifetime=config.db_max_cached_statement_lifetime,
+            max_cacheable_statement_size=config.db_max_cacheable_statement_size,
+            server_settings={"jit": "off"},
+            init=_init_connection,
         )
     return _pool
 
 
+async def health_check() -> bool:
+    """Return True if the database answers a trivial query.
+
+    Creates the pool if needed; a failed connection counts as unhealthy.
+    """
+    try:
+        pool = await get_pool()
+        return await pool.fetchval("SELECT 1") == 1
+    except (OSError, asyncpg.PostgresError) as exc:
+        logger.error("Database health check failed: {}", exc)
+        return False
+
+
+def pool_stats() -> dict[str, int]:
+    """Current pool occupancy (empty if the pool has not been created)."""
+    if _pool is None:
+        return {}
+    return {
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+    }
+
+
 async def close_pool() -> None:
     """Gracefully close the connection pool."""
     global _pool
     if _pool is not None:
+        logger.opt(lazy=True).debug("Closing pool: {}", pool_stats)
         await _pool.close()
         _pool = None
         logger.info("Connection pool closed")
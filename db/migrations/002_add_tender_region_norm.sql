@@ -0,0 +1,11 @@
+-- Migration 002: Add a lower-cased region column for substring region filters.
+--
+-- Tashkent queries match city + oblast by substring; a generated lower(region)
+-- column with a trigram index lets LIKE ANY (...) use an index scan instead of
+-- case-folding every row with ILIKE.
+
+ALTER TABLE tender_results
+    ADD COLUMN IF NOT EXISTS region_norm TEXT GENERATED ALWAYS AS (lower(region)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tender_region_norm_trgm
+    ON tender_results USING gin (region_norm gin_trgm_ops);
@@ -0,0 +1,26 @@
+-- Migration 003: Covering indexes for the rolling 12-month tender window.
+--
+-- Most analysis queries filter deal_date >= CURRENT_DATE - INTERVAL '12 months'
+-- and aggregate deal_cost/start_cost grouped by provider, region or month.
+-- Putting those columns in INCLUDE lists lets the planner answer them with
+-- index-only scans.  The window is relative to CURRENT_DATE, so these are full
+-- (not partial) indexes; a fixed-date partial predicate would go stale.
+--
+-- CONCURRENTLY: run with plain `psql -f` (autocommit), not inside a transaction.
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_tender_deal_date;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tender_deal_date
+    ON tender_results (deal_date DESC)
+    INCLUDE (deal_cost, start_cost, participants_count, provider_stir);
+
+-- Supersedes the single-column provider index (same leading column)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tender_provider_date
+    ON tender_results (provider_stir, deal_date DESC)
+    INCLUDE (deal_cost, start_cost);
+DROP INDEX CONCURRENTLY IF EXISTS idx_tender_provider;
+
+-- Supersedes the single-column region index (same leading column)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tender_region_date
+    ON tender_results (region, deal_date DESC)
+    INCLUDE (deal_cost, start_cost);
+DROP INDEX CONCURRENTLY IF EXISTS idx_tender_region;
@@ -0,0 +1,69 @@
+-- Migration 004: Materialized views for report-wide aggregates.
+--
+-- Leaderboard, rating distribution and top-50 benchmark change only when
+-- scraping/enrichment runs, so they are precomputed here and refreshed
+-- (CONCURRENTLY, hence the unique indexes) at the end of
+-- EnrichmentPipeline.run.
+
+-- Contractor leaderboard source.  Company-type exclusion is applied at
+-- query time (it comes from config), so company_type is carried along.
+CREATE MATERIALIZED VIEW mv_top_companies_overall AS
+SELECT
+    stir,
+    canonical_name,
+    region,
+    rating_letter,
+    rating_score,
+    total_wins,
+    total_contract_value,
+    avg_discount_pct,
+    employee_count,
+    company_type
+FROM companies
+WHERE total_wins > 0;
+
+CREATE UNIQUE INDEX idx_mv_top_companies_stir ON mv_top_companies_overall (stir);
+CREATE INDEX idx_mv_top_companies_wins        ON mv_top_companies_overall (total_wins DESC);
+
+-- Companies per rating letter
+CREATE MATERIALIZED VIEW mv_rating_distribution AS
+SELECT
+    rating_letter,
+    COUNT(*)                                AS company_count,
+    ROUND(AVG(rating_score)::numeric, 2)    AS avg_score,
+    MIN(rating_score)                       AS min_score,
+    MAX(rating_score)                       AS max_score
+FROM companies
+WHERE rating_letter IS NOT NULL
+GROUP BY rating_letter;
+
+CREATE UNIQUE INDEX idx_mv_rating_distribution_letter ON mv_rating_distribution (rating_letter);
+
+-- Average category scores of the 50 best-rated companies
+CREATE MATERIALIZED VIEW mv_top50_benchmark AS
+WITH top50 AS MATERIALIZED (
+    SELECT stir FROM companies
+    WHERE rating_score IS NOT NULL
+    ORDER BY rating_score DESC
+    LIMIT 50
+),
+cat_sum AS (
+    SELECT cr.company_stir, rk.category_id,
+           SUM(cr.earned_points) AS earned, SUM(cr.max_points) AS max_pts
+    FROM company_ratings cr
+    JOIN top50 ON top50.stir = cr.company_stir
+    JOIN rating_criteria rk ON cr.criterion_id = rk.id
+    GROUP BY cr.company_stir, rk.category_id
+)
+SELECT
+    rc.id                                                            AS category_id,
+    rc.name_ru,
+    rc.display_order,
+    ROUND(AVG(cat_sum.earned)::numeric, 2)                           AS avg_earned,
+    ROUND(AVG(cat_sum.max_pts)::numeric, 2)                          AS avg_max,
+    ROUND(AVG(cat_sum.earned / NULLIF(cat_sum.max_pts, 0) * 100)::numeric, 1) AS avg_pct
+FROM cat_sum
+JOIN rating_categories rc ON cat_sum.category_id = rc.id
+GROUP BY rc.id, rc.name_ru, rc.display_order;
+
+CREATE UNIQUE INDEX idx_mv_top50_benchmark_category ON mv_top50_benchmark (category_id);
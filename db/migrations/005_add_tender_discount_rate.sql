@@ -0,0 +1,13 @@
+-- Migration 005: Precompute the per-deal discount used by AVG() aggregates.
+--
+-- discount_pct (NUMERIC(5,2), 0 when start_cost is 0) stays for display.
+-- discount_rate is NULL when there is no start price, matching the
+-- CASE WHEN start_cost > 0 ... END expression the aggregates used to
+-- evaluate on every row.  Adding a STORED generated column backfills it.
+
+ALTER TABLE tender_results
+    ADD COLUMN IF NOT EXISTS discount_rate DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN start_cost > 0
+             THEN ((start_cost - deal_cost) / start_cost * 100)::double precision
+        END
+    ) STORED;
@@ -0,0 +1,13 @@
+-- Migration 006: Covering partial index for per-rating-letter aggregates.
+--
+-- get_high_rated_without_etender groups companies by rating_letter and counts
+-- total_wins > 0, ordered by MIN(rating_score).  With both columns in INCLUDE
+-- the aggregate is an index-only scan; unrated companies are left out.
+--
+-- CONCURRENTLY: run with plain `psql -f` (autocommit), not inside a transaction.
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_companies_rating_letter;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_companies_rating_letter
+    ON companies (rating_letter)
+    INCLUDE (total_wins, rating_score)
+    WHERE rating_letter IS NOT NULL;
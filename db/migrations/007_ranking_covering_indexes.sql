@@ -0,0 +1,21 @@
+-- Migration 007: Covering indexes for the ranking and market-overview scans.
+--
+-- idx_companies_top_wins: get_top_companies reads the top N winners in
+-- total_wins order with every displayed column (and company_type for the
+-- contractor filter) in INCLUDE, so it stops after N index-only tuples.
+--
+-- idx_tender_deal_date gains region and discount_rate, which the fused
+-- market-overview GROUPING SETS scan also reads.
+--
+-- CONCURRENTLY: run with plain `psql -f` (autocommit), not inside a transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_companies_top_wins
+    ON companies (total_wins DESC)
+    INCLUDE (stir, canonical_name, region, rating_letter, rating_score,
+             total_contract_value, avg_discount_pct, employee_count, company_type)
+    WHERE total_wins > 0;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_tender_deal_date;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tender_deal_date
+    ON tender_results (deal_date DESC)
+    INCLUDE (deal_cost, start_cost, participants_count, provider_stir, region, discount_rate);
@@ -0,0 +1,30 @@
+-- Migration 008: Precomputed contractor ranks.
+--
+-- get_company_position needs win/volume/rating ranks over the contractor
+-- pool; they only change when enrichment runs, so they are computed once
+-- here and refreshed CONCURRENTLY with the other report views.
+
+-- Contractor ranks for get_company_position.  Unlike the leaderboard the
+-- exclusion has to happen before ranking, so the excluded company types are
+-- spelled out here; keep them in sync with config.excluded_company_types.
+CREATE MATERIALIZED VIEW mv_company_ranks AS
+SELECT
+    stir,
+    canonical_name,
+    region,
+    rating_letter,
+    rating_score,
+    total_wins,
+    total_contract_value,
+    avg_discount_pct,
+    employee_count,
+    RANK() OVER (ORDER BY total_wins DESC)               AS rank_wins,
+    RANK() OVER (ORDER BY total_contract_value DESC)     AS rank_volume,
+    RANK() OVER (ORDER BY rating_score DESC NULLS LAST)  AS rank_rating,
+    COUNT(*) OVER ()                                     AS total_companies
+FROM companies
+WHERE (total_wins > 0 OR rating_score IS NOT NULL)
+  AND company_type NOT IN ('consultant', 'laboratory', 'assessor', 'other');
+
+CREATE UNIQUE INDEX idx_mv_company_ranks_stir ON mv_company_ranks (stir);
+CREATE INDEX idx_mv_company_ranks_wins        ON mv_company_ranks (rank_wins);
@@ -0,0 +1,11 @@
+-- Migration 009: Searchable text copy of companies.raw_names.
+--
+-- Name searches and company-type classification match raw_names::text with
+-- ILIKE '%...%'.  Casting per row defeats indexing; a stored generated column
+-- with a trigram index lets the same ILIKE use a bitmap index scan.
+
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS raw_names_text TEXT GENERATED ALWAYS AS (raw_names::text) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_companies_raw_names_trgm
+    ON companies USING gin (raw_names_text gin_trgm_ops);
@@ -0,0 +1,25 @@
+-- Migration 010: Daily per-region tender rollup.
+--
+-- Monthly trend and regional distribution re-scanned every tender in the
+-- lookback window on each call.  Tender rows only change on scrape, so they
+-- are rolled up per (deal_date, region) here and refreshed CONCURRENTLY at
+-- the end of each etender scrape and with the other report views after
+-- enrichment.  Day granularity keeps the
+-- "deal_date >= CURRENT_DATE - N months" windows exact.
+
+-- Daily tender rollup per region: the monthly trend and regional breakdown
+-- aggregate a few thousand rollup rows instead of every tender in the window.
+-- Discount is kept as sum + count so averages can be re-aggregated exactly.
+CREATE MATERIALIZED VIEW mv_tender_daily AS
+SELECT
+    deal_date,
+    COALESCE(region, 'Не определён')   AS region,
+    COUNT(*)                            AS tenders,
+    COALESCE(SUM(deal_cost), 0)         AS volume,
+    SUM(discount_rate)                  AS discount_sum,
+    COUNT(discount_rate)                AS discount_count
+FROM tender_results
+WHERE deal_date IS NOT NULL
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX idx_mv_tender_daily_date_region ON mv_tender_daily (deal_date, region);
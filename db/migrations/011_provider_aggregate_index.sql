@@ -0,0 +1,16 @@
+-- Migration 011: Cover the per-provider enrichment aggregate.
+--
+-- aggregate_tender_stats now computes wins, value, discount, dates and
+-- active regions in one GROUP BY provider_stir pass.  Adding
+-- discount_rate and region to INCLUDE lets that pass run as an
+-- index-only scan in provider order; the partial predicate drops the
+-- unattributed tenders it never reads.  Lookups by a specific
+-- provider_stir imply the predicate and keep using the index.
+--
+-- CONCURRENTLY: run with plain `psql -f` (autocommit), not inside a transaction.
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_tender_provider_date;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tender_provider_date
+    ON tender_results (provider_stir, deal_date DESC)
+    INCLUDE (deal_cost, start_cost, discount_rate, region)
+    WHERE provider_stir IS NOT NULL;
@@ -0,0 +1,16 @@
+-- Migration 012: Trigram index for substring matches on customer_name.
+--
+-- Layer 3 of fill_missing_regions matches customer_name ILIKE '%pattern%'
+-- alongside deal_description, which already has idx_tender_desc_trgm.  The
+-- B-tree idx_tender_customer serves equality and GROUP BY only, so the
+-- customer side of the OR forced a sequential scan.  With both sides
+-- trigram-indexed the planner can BitmapOr the two GIN scans.  The
+-- companies name columns are covered by idx_companies_name_trgm and
+-- idx_companies_raw_names_trgm (migration 009).
+--
+-- CONCURRENTLY: run with plain `psql -f` (autocommit), not inside a transaction.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tender_customer_trgm
+    ON tender_results USING gin (customer_name gin_trgm_ops);
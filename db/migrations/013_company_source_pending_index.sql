@@ -0,0 +1,15 @@
+-- Migration 013: Partial index on companies still waiting for source = 'both'.
+--
+-- update_company_source runs after every enrichment and looks for rated
+-- companies with tender wins whose source is not yet 'both'.  In steady
+-- state almost every such company is already flagged, but the UPDATE
+-- still scanned the whole table.  The index keeps only the pending rows,
+-- so it stays near-empty and the UPDATE touches only new candidates.
+-- Its predicate matches the query's WHERE clause exactly, so the planner
+-- can use it.
+--
+-- CONCURRENTLY: run with plain `psql -f` (autocommit), not inside a transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_companies_source_pending
+    ON companies (stir)
+    WHERE rating_fetched_at IS NOT NULL AND total_wins > 0 AND source != 'both';
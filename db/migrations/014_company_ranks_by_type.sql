@@ -0,0 +1,43 @@
+-- Migration 014: Drive mv_company_ranks exclusions from configuration.
+--
+-- Migration 008 ranked inside the view with the excluded company types
+-- spelled out, so an overridden config.excluded_company_types was silently
+-- ignored by get_company_position.  The exclusions now live in a small table
+-- that EnrichmentPipeline.refresh_materialized_views syncs from config right
+-- before refreshing the views; the view keeps its precomputed ranks, so a
+-- position lookup stays an index probe on stir / rank_wins.
+
+-- Company types left out of contractor rankings (synced from config)
+CREATE TABLE IF NOT EXISTS ranking_excluded_company_types (
+    company_type VARCHAR(30) PRIMARY KEY
+);
+
+INSERT INTO ranking_excluded_company_types (company_type)
+VALUES ('consultant'), ('laboratory'), ('assessor'), ('other')
+ON CONFLICT DO NOTHING;
+
+DROP MATERIALIZED VIEW IF EXISTS mv_company_ranks;
+
+-- Contractor ranks for get_company_position.  The exclusion has to happen
+-- before ranking, so it reads ranking_excluded_company_types.
+CREATE MATERIALIZED VIEW mv_company_ranks AS
+SELECT
+    stir,
+    canonical_name,
+    region,
+    rating_letter,
+    rating_score,
+    total_wins,
+    total_contract_value,
+    avg_discount_pct,
+    employee_count,
+    RANK() OVER (ORDER BY total_wins DESC)               AS rank_wins,
+    RANK() OVER (ORDER BY total_contract_value DESC)     AS rank_volume,
+    RANK() OVER (ORDER BY rating_score DESC NULLS LAST)  AS rank_rating,
+    COUNT(*) OVER ()                                     AS total_companies
+FROM companies
+WHERE (total_wins > 0 OR rating_score IS NOT NULL)
+  AND company_type NOT IN (SELECT company_type FROM ranking_excluded_company_types);
+
+CREATE UNIQUE INDEX idx_mv_company_ranks_stir ON mv_company_ranks (stir);
+CREATE INDEX idx_mv_company_ranks_wins        ON mv_company_ranks (rank_wins);
@@ -12,6 +12,7 @@ CREATE TABLE companies (
     stir            VARCHAR(9) PRIMARY KEY,
     canonical_name  VARCHAR(500) NOT NULL,
     raw_names       JSONB DEFAULT '[]'::jsonb,
+    raw_names_text  TEXT GENERATED ALWAYS AS (raw_names::text) STORED,  -- for trigram search
 
     -- From reyting.mc.uz
     region              VARCHAR(100),
@@ -39,12 +40,20 @@ CREATE TABLE companies (
 );
 
 CREATE INDEX idx_companies_rating_score          ON companies (rating_score DESC NULLS LAST);
-CREATE INDEX idx_companies_rating_letter         ON companies (rating_letter);
+CREATE INDEX idx_companies_rating_letter         ON companies (rating_letter)
+    INCLUDE (total_wins, rating_score) WHERE rating_letter IS NOT NULL;
 CREATE INDEX idx_companies_total_wins            ON companies (total_wins DESC);
+CREATE INDEX idx_companies_top_wins              ON companies (total_wins DESC)
+    INCLUDE (stir, canonical_name, region, rating_letter, rating_score,
+             total_contract_value, avg_discount_pct, employee_count, company_type)
+    WHERE total_wins > 0;
 CREATE INDEX idx_companies_total_contract_value  ON companies (total_contract_value DESC);
 CREATE INDEX idx_companies_region                ON companies (region);
 CREATE INDEX idx_companies_type                  ON companies (company_type);
 CREATE INDEX idx_companies_name_trgm             ON companies USING gin (canonical_name gin_trgm_ops);
+CREATE INDEX idx_companies_raw_names_trgm        ON companies USING gin (raw_names_text gin_trgm_ops);
+CREATE INDEX idx_companies_source_pending        ON companies (stir)
+    WHERE rating_fetched_at IS NOT NULL AND total_wins > 0 AND source != 'both';
 
 
 -- ============================================================
@@ -63,6 +72,12 @@ CREATE TABLE tender_results (
                                  ELSE 0
                             END
                         ) STORED,
+    -- Unrounded, NULL without a start price: what the AVG() aggregates read
+    discount_rate       DOUBLE PRECISION GENERATED ALWAYS AS (
+                            CASE WHEN start_cost > 0
+                                 THEN ((start_cost - deal_cost) / start_cost * 100)::double precision
+                            END
+                        ) STORED,
 
     -- Parties
     customer_name       VARCHAR(500),
@@ -74,6 +89,7 @@ CREATE TABLE tender_results (
     deal_description    TEXT,
     participants_count  INTEGER,
     region              VARCHAR(100),
+    region_norm         TEXT GENERATED ALWAYS AS (lower(region)) STORED,
 
     -- Raw data preservation
     raw_data            JSONB,
@@ -84,11 +100,16 @@ CREATE TABLE tender_results (
         FOREIGN KEY (provider_stir) REFERENCES companies (stir) ON DELETE SET NULL
 );
 
-CREATE INDEX idx_tender_deal_date       ON tender_results (deal_date DESC);
-CREATE INDEX idx_tender_provider        ON tender_results (provider_stir);
+CREATE INDEX idx_tender_deal_date       ON tender_results (deal_date DESC)
+    INCLUDE (deal_cost, start_cost, participants_count, provider_stir, region, discount_rate);
+CREATE INDEX idx_tender_provider_date   ON tender_results (provider_stir, deal_date DESC)
+    INCLUDE (deal_cost, start_cost, discount_rate, region) WHERE provider_stir IS NOT NULL;
 CREATE INDEX idx_tender_customer        ON tender_results (customer_name);
+CREATE INDEX idx_tender_customer_trgm   ON tender_results USING gin (customer_name gin_trgm_ops);
 CREATE INDEX idx_tender_deal_cost       ON tender_results (deal_cost DESC);
-CREATE INDEX idx_tender_region          ON tender_results (region);
+CREATE INDEX idx_tender_region_date     ON tender_results (region, deal_date DESC)
+    INCLUDE (deal_cost, start_cost);
+CREATE INDEX idx_tender_region_norm_trgm ON tender_results USING gin (region_norm gin_trgm_ops);
 CREATE INDEX idx_tender_desc_trgm       ON tender_results USING gin (deal_description gin_trgm_ops);
 
 
@@ -236,3 +257,124 @@ SELECT
 FROM tender_results t
 LEFT JOIN companies c ON t.provider_stir = c.stir
 WHERE t.deal_date >= CURRENT_DATE - INTERVAL '12 months';
+
+
+-- ============================================================
+-- 9. MATERIALIZED VIEWS (refreshed by the enrichment pipeline)
+-- ============================================================
+
+-- Contractor leaderboard source.  Company-type exclusion is applied at
+-- query time (it comes from config), so company_type is carried along.
+CREATE MATERIALIZED VIEW mv_top_companies_overall AS
+SELECT
+    stir,
+    canonical_name,
+    region,
+    rating_letter,
+    rating_score,
+    total_wins,
+    total_contract_value,
+    avg_discount_pct,
+    employee_count,
+    company_type
+FROM companies
+WHERE total_wins > 0;
+
+CREATE UNIQUE INDEX idx_mv_top_companies_stir ON mv_top_companies_overall (stir);
+CREATE INDEX idx_mv_top_companies_wins        ON mv_top_companies_overall (total_wins DESC);
+
+-- Companies per rating letter
+CREATE MATERIALIZED VIEW mv_rating_distribution AS
+SELECT
+    rating_letter,
+    COUNT(*)                                AS company_count,
+    ROUND(AVG(rating_score)::numeric, 2)    AS avg_score,
+    MIN(rating_score)                       AS min_score,
+    MAX(rating_score)                       AS max_score
+FROM companies
+WHERE rating_letter IS NOT NULL
+GROUP BY rating_letter;
+
+CREATE UNIQUE INDEX idx_mv_rating_distribution_letter ON mv_rating_distribution (rating_letter);
+
+-- Average category scores of the 50 best-rated companies
+CREATE MATERIALIZED VIEW mv_top50_benchmark AS
+WITH top50 AS MATERIALIZED (
+    SELECT stir FROM companies
+    WHERE rating_score IS NOT NULL
+    ORDER BY rating_score DESC
+    LIMIT 50
+),
+cat_sum AS (
+    SELECT cr.company_stir, rk.category_id,
+           SUM(cr.earned_points) AS earned, SUM(cr.max_points) AS max_pts
+    FROM company_ratings cr
+    JOIN top50 ON top50.stir = cr.company_stir
+    JOIN rating_criteria rk ON cr.criterion_id = rk.id
+    GROUP BY cr.company_stir, rk.category_id
+)
+SELECT
+    rc.id                                                            AS category_id,
+    rc.name_ru,
+    rc.display_order,
+    ROUND(AVG(cat_sum.earned)::numeric, 2)                           AS avg_earned,
+    ROUND(AVG(cat_sum.max_pts)::numeric, 2)                          AS avg_max,
+    ROUND(AVG(cat_sum.earned / NULLIF(cat_sum.max_pts, 0) * 100)::numeric, 1) AS avg_pct
+FROM cat_sum
+JOIN rating_categories rc ON cat_sum.category_id = rc.id
+GROUP BY rc.id, rc.name_ru, rc.display_order;
+
+CREATE UNIQUE INDEX idx_mv_top50_benchmark_category ON mv_top50_benchmark (category_id);
+
+-- Company types left out of contractor rankings.  Synced from
+-- config.excluded_company_types by EnrichmentPipeline.refresh_materialized_views
+-- before the views are refreshed.
+CREATE TABLE ranking_excluded_company_types (
+    company_type VARCHAR(30) PRIMARY KEY
+);
+
+INSERT INTO ranking_excluded_company_types (company_type)
+VALUES ('consultant'), ('laboratory'), ('assessor'), ('other');
+
+-- Contractor ranks for get_company_position.  The exclusion has to happen
+-- before ranking, so it reads ranking_excluded_company_types.
+CREATE MATERIALIZED VIEW mv_company_ranks AS
+SELECT
+    stir,
+    canonical_name,
+    region,
+    rating_letter,
+    rating_score,
+    total_wins,
+    total_contract_value,
+    avg_discount_pct,
+    employee_count,
+    RANK() OVER (ORDER BY total_wins DESC)               AS rank_wins,
+    RANK() OVER (ORDER BY total_contract_value DESC)     AS rank_volume,
+    RANK() OVER (ORDER BY rating_score DESC NULLS LAST)  AS rank_rating,
+    COUNT(*) OVER ()                                     AS total_companies
+FROM companies
+WHERE (total_wins > 0 OR rating_score IS NOT NULL)
+  AND company_type NOT IN (SELECT company_type FROM ranking_excluded_company_types);
+
+CREATE UNIQUE INDEX idx_mv_company_ranks_stir ON mv_company_ranks (stir);
+CREATE INDEX idx_mv_company_ranks_wins        ON mv_company_ranks (rank_wins);
+
+-- Daily tender rollup per region: the monthly trend and regional breakdown
+-- aggregate a few thousand rollup rows instead of every tender in the window.
+-- Discount is kept as sum + count so averages can be re-aggregated exactly.
+-- Refreshed at the end of every etender scrape as well as after enrichment,
+-- so it never lags the tender_results rows that live report queries read.
+CREATE MATERIALIZED VIEW mv_tender_daily AS
+SELECT
+    deal_date,
+    COALESCE(region, 'Не определён')   AS region,
+    COUNT(*)                            AS tenders,
+    COALESCE(SUM(deal_cost), 0)         AS volume,
+    SUM(discount_rate)                  AS discount_sum,
+    COUNT(discount_rate)                AS discount_count
+FROM tender_results
+WHERE deal_date IS NOT NULL
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX idx_mv_tender_daily_date_region ON mv_tender_daily (deal_date, region);
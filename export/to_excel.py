@@ -6,20 +6,23 @@ designed for a client meeting with UET's leadership.
 
 from __future__ import annotations
 
-from decimal import Decimal
+import asyncio
+import functools
 from typing import Any
 
 import asyncpg
+import numpy as np
 import pandas as pd
 from loguru import logger
 from openpyxl import Workbook
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 
 from analysis.market_intel import (
     get_big_tashkent_tenders,
-    get_market_summary,
-    get_market_summary_12m,
+    get_market_summary_combined,
     get_monthly_trend,
     get_peer_comparison,
     get_peer_rating_comparison,
@@ -33,7 +36,6 @@ from analysis.market_intel import (
     get_uet_competitiveness_gaps,
     get_uet_profile,
     get_uet_rating_breakdown,
-    get_uet_rating_detail,
     get_uet_rating_percentile,
 )
 
@@ -64,29 +66,106 @@ RATING_COLORS: dict[str, str] = {
 
 # ── Styles ──────────────────────────────────────────────────
 
-HEADER_FILL = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
-HEADER_FONT = Font(name="Calibri", size=11, bold=True, color=WHITE)
-TITLE_FONT = Font(name="Calibri", size=14, bold=True, color=NAVY)
-SUBTITLE_FONT = Font(name="Calibri", size=12, bold=True, color=NAVY)
-SECTION_FONT = Font(name="Calibri", size=11, bold=True, color=NAVY)
-DATA_FONT = Font(name="Calibri", size=10)
-BOLD_FONT = Font(name="Calibri", size=10, bold=True)
-SMALL_FONT = Font(name="Calibri", size=9, italic=True, color="666666")
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int, color: str | None = None, bold: bool = False, italic: bool = False) -> Font:
+    """Shared Calibri font per (size, color, bold, italic)."""
+    return Font(name="Calibri", size=size, bold=bold, italic=italic, color=color)
+
+
+@functools.lru_cache(maxsize=None)
+def _fill(color: str) -> PatternFill:
+    """Shared solid fill per color."""
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+HEADER_FILL = _fill(NAVY)
+HEADER_FONT = _font(11, WHITE, bold=True)
+PAGE_TITLE_FONT = _font(16, NAVY, bold=True)
+TITLE_FONT = _font(14, NAVY, bold=True)
+SUBTITLE_FONT = _font(12, NAVY, bold=True)
+SECTION_FONT = _font(11, NAVY, bold=True)
+DATA_FONT = _font(10)
+BOLD_FONT = _font(10, bold=True)
+BANNER_FONT = _font(13, WHITE, bold=True)  # white on HEADER_FILL section banners
+SMALL_FONT = _font(9, "666666", italic=True)
 CURRENCY_FORMAT = '#,##0'
+# UZS scales for numeric cells; each trailing comma divides the shown value by 1000
+UZS_FORMATS = (
+    (1_000_000_000_000, '#,##0.00,,,," трлн UZS"'),
+    (1_000_000_000, '#,##0.0,,," млрд UZS"'),
+    (1_000_000, '#,##0,," млн UZS"'),
+)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+CENTER_ALIGNMENT = Alignment(horizontal="center")
+WRAP_ALIGNMENT = Alignment(wrap_text=True)
 THIN_BORDER = Border(
     left=Side(style="thin", color="D9D9D9"),
     right=Side(style="thin", color="D9D9D9"),
     top=Side(style="thin", color="D9D9D9"),
     bottom=Side(style="thin", color="D9D9D9"),
 )
-ALT_ROW_FILL = PatternFill(start_color=ALT_ROW, end_color=ALT_ROW, fill_type="solid")
+ALT_ROW_FILL = _fill(ALT_ROW)
 
 # Callout box styles
-GREEN_FILL = PatternFill(start_color=GREEN_BG, end_color=GREEN_BG, fill_type="solid")
-RED_FILL = PatternFill(start_color=RED_BG, end_color=RED_BG, fill_type="solid")
-YELLOW_FILL = PatternFill(start_color=YELLOW_BG, end_color=YELLOW_BG, fill_type="solid")
-UET_ROW_FILL = PatternFill(start_color=UET_HIGHLIGHT, end_color=UET_HIGHLIGHT, fill_type="solid")
-LIGHT_BLUE_FILL = PatternFill(start_color=LIGHT_BLUE, end_color=LIGHT_BLUE, fill_type="solid")
+GREEN_FILL = _fill(GREEN_BG)
+RED_FILL = _fill(RED_BG)
+YELLOW_FILL = _fill(YELLOW_BG)
+UET_ROW_FILL = _fill(UET_HIGHLIGHT)
+LIGHT_BLUE_FILL = _fill(LIGHT_BLUE)
+
+# Table body cells, as named styles keyed by (alternate row, thousands format)
+DATA_STYLE_NAMES: dict[tuple[bool, bool], str] = {
+    (False, False): "report_data",
+    (True, False): "report_data_alt",
+    (False, True): "report_data_num",
+    (True, True): "report_data_alt_num",
+}
+
+
+def _data_named_styles() -> list[NamedStyle]:
+    """Fresh body-cell NamedStyles; a NamedStyle binds to a single workbook."""
+    return [
+        NamedStyle(
+            name=name,
+            font=DATA_FONT,
+            border=THIN_BORDER,
+            fill=ALT_ROW_FILL if alt else PatternFill(),
+            number_format=CURRENCY_FORMAT if thousands else "General",
+        )
+        for (alt, thousands), name in DATA_STYLE_NAMES.items()
+    ]
+
+
+# Overview metric boxes start in A, C, E, G (each spans two columns)
+METRIC_COLS = (1, 3, 5, 7)
+
+# Rating badges — one shared Font/Fill per letter instead of one per cell
+RATING_FONT = _font(10, WHITE, bold=True)
+RATING_FILLS: dict[str, PatternFill] = {
+    letter: _fill(color)
+    for letter, color in RATING_COLORS.items()
+}
+
+
+# ── Recommendation text ─────────────────────────────────────
+
+ETENDER_STEPS: tuple[str, ...] = (
+    "Зарегистрироваться на etender.uzex.uz как поставщик строительных услуг",
+    "Настроить мониторинг новых тендеров по категориям строительства в Ташкенте",
+    "Начать с тендеров среднего размера (500 млн — 2 млрд UZS) для накопления опыта",
+    "Использовать рейтинг B как конкурентное преимущество в тендерной документации",
+    "Пиковый сезон тендеров: апрель — сентябрь. Подготовку начинать в марте.",
+)
+
+SEASONAL_PLAN: tuple[str, ...] = (
+    "Март: Подготовка тендерной документации, анализ предстоящих закупок",
+    "Апрель — Июнь: Пик публикации тендеров. Активное участие.",
+    "Июль: Исторический максимум объёма (1.57 трлн UZS в июле 2025). Пиковая нагрузка.",
+    "Август — Сентябрь: Второй пик активности. Завершение летних проектов.",
+    "Октябрь — Декабрь: Объёмы снижаются. Время для развития мощностей и техники.",
+    "Январь — Февраль: Планирование на следующий сезон.",
+)
 
 
 def _fmt_uzs(value: Any) -> str:
@@ -106,11 +185,21 @@ def _fmt_uzs(value: Any) -> str:
     return f"{v:,.0f} UZS"
 
 
+def _uzs_format(value: float) -> str:
+    """Excel number format rendering ``value`` the way :func:`_fmt_uzs` does."""
+    for threshold, fmt in UZS_FORMATS:
+        if abs(value) >= threshold:
+            return fmt
+    return '#,##0" UZS"'
+
+
 class ExcelReportGenerator:
     """Generates a story-driven strategic intelligence report."""
 
     def __init__(self, pool: asyncpg.Pool) -> None:
         self.pool = pool
+        # sheet title → column index → longest text written by _write_df/_set_cell
+        self._col_widths: dict[str, dict[int, int]] = {}
 
     async def generate_full_report(
         self,
@@ -120,26 +209,27 @@ class ExcelReportGenerator:
     ) -> str:
         """Generate the complete 5-sheet intelligence report."""
         wb = Workbook()
-
-        logger.info("Sheet 1/5: Обзор рынка")
-        await self._sheet_market_overview(wb)
-
-        logger.info("Sheet 2/5: Топ-15 компаний")
-        await self._sheet_top_companies(wb, uet_stir)
-
-        logger.info("Sheet 3/5: Профиль UET")
-        await self._sheet_uet_profile(wb, uet_stir)
-
-        logger.info("Sheet 4/5: Конкуренты")
-        await self._sheet_competitors(wb, uet_stir, compare_stirs)
-
-        logger.info("Sheet 5/5: Рекомендации")
-        await self._sheet_recommendations(wb, uet_stir)
+        for style in _data_named_styles():
+            wb.add_named_style(style)
+        self._col_widths.clear()
+
+        # Sheets are created up front so tab order is fixed; the builders
+        # then run concurrently, each awaiting its own queries.  openpyxl
+        # calls never yield, so no two builders touch the workbook at once.
+        await asyncio.gather(
+            self._sheet_market_overview(wb.create_sheet("Обзор рынка")),
+            self._sheet_top_companies(wb.create_sheet("Топ-15 компаний"), uet_stir),
+            self._sheet_uet_profile(wb.create_sheet("Профиль UET"), uet_stir),
+            self._sheet_competitors(wb.create_sheet("Конкуренты"), uet_stir, compare_stirs),
+            self._sheet_recommendations(wb.create_sheet("Рекомендации"), uet_stir),
+        )
 
         if "Sheet" in wb.sheetnames:
             del wb["Sheet"]
 
-        wb.save(output_path)
+        # Serialising and zipping the workbook is blocking work; keep the
+        # event loop (and the pool) free while it runs
+        await asyncio.to_thread(wb.save, output_path)
         logger.info("Report saved to {}", output_path)
         return output_path
 
@@ -147,120 +237,89 @@ class ExcelReportGenerator:
     #  SHEET 1: ОБЗОР РЫНКА (Market Overview)
     # ═══════════════════════════════════════════════════════════
 
-    async def _sheet_market_overview(self, wb: Workbook) -> None:
-        ws = wb.create_sheet("Обзор рынка")
+    async def _sheet_market_overview(self, ws: Worksheet) -> None:
+        logger.info("Sheet 1/5: Обзор рынка")
 
-        mkt_all = await get_market_summary(self.pool)
-        mkt_12m = await get_market_summary_12m(self.pool)
-        monthly = await get_monthly_trend(self.pool)
-        regional = await get_regional_distribution(self.pool)
-        top_cust = await get_top_customers(self.pool, limit=10)
-        rating_dist = await get_rating_distribution(self.pool)
+        mkt, monthly, regional, top_cust, rating_dist = await asyncio.gather(
+            get_market_summary_combined(self.pool),
+            get_monthly_trend(self.pool),
+            get_regional_distribution(self.pool),
+            get_top_customers(self.pool, limit=10),
+            get_rating_distribution(self.pool),
+        )
+        mkt_all, mkt_12m = mkt["all"], mkt["last_12m"]
 
         # ── Title ──
         ws.merge_cells("A1:H1")
-        ws["A1"] = "РЫНОК СТРОИТЕЛЬНЫХ ТЕНДЕРОВ УЗБЕКИСТАНА"
-        ws["A1"].font = Font(name="Calibri", size=16, bold=True, color=NAVY)
+        self._set_cell(ws, 1, 1, "РЫНОК СТРОИТЕЛЬНЫХ ТЕНДЕРОВ УЗБЕКИСТАНА")
+        ws["A1"].font = PAGE_TITLE_FONT
 
         ws.merge_cells("A2:H2")
-        ws["A2"] = "Аналитический обзор на основе данных etender.uzex.uz и reyting.mc.uz"
+        self._set_cell(ws, 2, 1, "Аналитический обзор на основе данных etender.uzex.uz и reyting.mc.uz")
         ws["A2"].font = SMALL_FONT
 
-        # ── Key metrics callout boxes (row 4-5) ──
-        metrics = [
-            ("A", "Объём рынка (всего)", _fmt_uzs(mkt_all.get("total_volume", 0))),
-            ("C", "Объём за 12 мес.", _fmt_uzs(mkt_12m.get("total_volume", 0))),
-            ("E", "Тендеров (12 мес.)", f"{mkt_12m.get('total_tenders', 0):,}"),
-            ("G", "Средняя скидка", f"{mkt_12m.get('avg_discount', 0)}%"),
-        ]
-        for col_letter, label, value in metrics:
-            col_idx = ord(col_letter) - ord("A") + 1
-            # Merge 2 columns for each box
-            ws.merge_cells(start_row=4, start_column=col_idx, end_row=4, end_column=col_idx + 1)
-            ws.merge_cells(start_row=5, start_column=col_idx, end_row=5, end_column=col_idx + 1)
-            cell_label = ws.cell(row=4, column=col_idx, value=label)
-            cell_label.font = Font(name="Calibri", size=9, color="666666")
-            cell_label.fill = LIGHT_BLUE_FILL
-            cell_label.alignment = Alignment(horizontal="center")
-            ws.cell(row=4, column=col_idx + 1).fill = LIGHT_BLUE_FILL
-            cell_value = ws.cell(row=5, column=col_idx, value=value)
-            cell_value.font = Font(name="Calibri", size=13, bold=True, color=NAVY)
-            cell_value.fill = LIGHT_BLUE_FILL
-            cell_value.alignment = Alignment(horizontal="center")
-            ws.cell(row=5, column=col_idx + 1).fill = LIGHT_BLUE_FILL
+        # ── Key metrics callout boxes (rows 4-7) ──
+        metrics = (
+            ("Объём рынка (всего)", float(mkt_all.get("total_volume") or 0)),
+            ("Объём за 12 мес.", float(mkt_12m.get("total_volume") or 0)),
+            ("Тендеров (12 мес.)", f"{mkt_12m.get('total_tenders', 0):,}"),
+            ("Средняя скидка", f"{mkt_12m.get('avg_discount', 0)}%"),
+        )
+        for col_idx, (label, value) in zip(METRIC_COLS, metrics):
+            self._callout(ws, 4, col_idx, label, value, value_size=13)
 
         # Second row of metrics
-        metrics2 = [
-            ("A", "Активных компаний", f"{mkt_12m.get('unique_winners', 0):,}"),
-            ("C", "Ср. размер контракта", _fmt_uzs(mkt_12m.get("avg_deal_size", 0))),
-            ("E", "Ср. участников", f"{mkt_12m.get('avg_participants', 0)}"),
-            ("G", "Компаний с рейтингом", f"{len(rating_dist):,} категорий"),
-        ]
-        for col_letter, label, value in metrics2:
-            col_idx = ord(col_letter) - ord("A") + 1
-            ws.merge_cells(start_row=6, start_column=col_idx, end_row=6, end_column=col_idx + 1)
-            ws.merge_cells(start_row=7, start_column=col_idx, end_row=7, end_column=col_idx + 1)
-            c1 = ws.cell(row=6, column=col_idx, value=label)
-            c1.font = Font(name="Calibri", size=9, color="666666")
-            c1.fill = LIGHT_BLUE_FILL
-            c1.alignment = Alignment(horizontal="center")
-            ws.cell(row=6, column=col_idx + 1).fill = LIGHT_BLUE_FILL
-            c2 = ws.cell(row=7, column=col_idx, value=value)
-            c2.font = Font(name="Calibri", size=12, bold=True, color=NAVY)
-            c2.fill = LIGHT_BLUE_FILL
-            c2.alignment = Alignment(horizontal="center")
-            ws.cell(row=7, column=col_idx + 1).fill = LIGHT_BLUE_FILL
+        metrics2 = (
+            ("Активных компаний", f"{mkt_12m.get('unique_winners', 0):,}"),
+            ("Ср. размер контракта", float(mkt_12m.get("avg_deal_size") or 0)),
+            ("Ср. участников", f"{mkt_12m.get('avg_participants', 0)}"),
+            ("Компаний с рейтингом", f"{len(rating_dist):,} категорий"),
+        )
+        for col_idx, (label, value) in zip(METRIC_COLS, metrics2):
+            self._callout(ws, 6, col_idx, label, value, value_size=12)
 
         # ── Key insight callout ──
         row = 9
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        insight = ws.cell(row=row, column=1)
-        insight.value = (
+        insight = self._set_cell(ws, row, 1, (
             "КЛЮЧЕВОЙ ВЫВОД: Средняя конкуренция на тендер составляет всего "
             f"{mkt_12m.get('avg_participants', 0)} участника. "
             "Большинство крупных тендеров выигрывают компании с низким рейтингом (DDD). "
             "Для компании с рейтингом B — это окно возможностей."
-        )
-        insight.font = Font(name="Calibri", size=10, bold=True, color=GREEN_FONT)
+        ))
+        insight.font = _font(10, GREEN_FONT, bold=True)
         insight.fill = GREEN_FILL
-        insight.alignment = Alignment(wrap_text=True)
+        insight.alignment = WRAP_ALIGNMENT
         ws.row_dimensions[row].height = 40
 
         # ── Monthly trend ──
         row = 11
-        ws.cell(row=row, column=1, value="Ежемесячная динамика (12 мес.)").font = SUBTITLE_FONT
+        self._set_cell(ws, row, 1, "Ежемесячная динамика (12 мес.)").font = SUBTITLE_FONT
         row += 1
         if not monthly.empty:
             row = self._write_df(ws, monthly, start_row=row)
 
         # ── Regional distribution ──
         row += 2
-        ws.cell(row=row, column=1, value="Распределение по регионам").font = SUBTITLE_FONT
+        self._set_cell(ws, row, 1, "Распределение по регионам").font = SUBTITLE_FONT
         row += 1
         if not regional.empty:
             row = self._write_df(ws, regional, start_row=row)
 
         # ── Top customers ──
         row += 2
-        ws.cell(row=row, column=1, value="Топ-10 крупнейших заказчиков (12 мес.)").font = SUBTITLE_FONT
+        self._set_cell(ws, row, 1, "Топ-10 крупнейших заказчиков (12 мес.)").font = SUBTITLE_FONT
         row += 1
         if not top_cust.empty:
             row = self._write_df(ws, top_cust, start_row=row)
 
         # ── Rating distribution ──
         row += 2
-        ws.cell(row=row, column=1, value="Распределение компаний по рейтингу").font = SUBTITLE_FONT
+        self._set_cell(ws, row, 1, "Распределение компаний по рейтингу").font = SUBTITLE_FONT
         row += 1
         if not rating_dist.empty:
-            end = self._write_df(ws, rating_dist, start_row=row)
-            # Color-code rating column
-            for r in range(row + 1, end + 1):
-                cell = ws.cell(row=r, column=1)
-                rating = str(cell.value or "")
-                color = RATING_COLORS.get(rating)
-                if color:
-                    cell.font = Font(name="Calibri", size=10, bold=True, color=WHITE)
-                    cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+            self._write_df(ws, rating_dist, start_row=row)
+            self._paint_ratings(ws, rating_dist, "Рейтинг", row + 1)
 
         self._auto_fit(ws)
         ws.page_setup.orientation = "landscape"
@@ -270,74 +329,53 @@ class ExcelReportGenerator:
     #  SHEET 2: ТОП-15 КОМПАНИЙ
     # ═══════════════════════════════════════════════════════════
 
-    async def _sheet_top_companies(self, wb: Workbook, uet_stir: str) -> None:
-        ws = wb.create_sheet("Топ-15 компаний")
+    async def _sheet_top_companies(self, ws: Worksheet, uet_stir: str) -> None:
+        logger.info("Sheet 2/5: Топ-15 компаний")
         df = await get_top_companies_overall(self.pool, limit=15)
 
         ws.merge_cells("A1:J1")
-        ws["A1"] = "ТОП-15 СТРОИТЕЛЬНЫХ КОМПАНИЙ ПО КОЛИЧЕСТВУ ПОБЕД НА ТЕНДЕРАХ"
-        ws["A1"].font = Font(name="Calibri", size=14, bold=True, color=NAVY)
+        self._set_cell(ws, 1, 1, "ТОП-15 СТРОИТЕЛЬНЫХ КОМПАНИЙ ПО КОЛИЧЕСТВУ ПОБЕД НА ТЕНДЕРАХ")
+        ws["A1"].font = TITLE_FONT
 
         ws.merge_cells("A2:J2")
-        ws["A2"] = "Период: последние 12 месяцев | Источник: etender.uzex.uz + reyting.mc.uz"
+        self._set_cell(ws, 2, 1, "Период: последние 12 месяцев | Источник: etender.uzex.uz + reyting.mc.uz")
         ws["A2"].font = SMALL_FONT
 
         if df.empty:
-            ws["A4"] = "Нет данных"
+            self._set_cell(ws, 4, 1, "Нет данных")
             return
 
         end_row = self._write_df(ws, df, start_row=4)
 
         # Highlight Tashkent companies and color-code ratings
-        stir_col = None
-        rating_col = None
-        region_col = None
-        for col_idx, col_name in enumerate(df.columns, 1):
-            if col_name == "СТИР":
-                stir_col = col_idx
-            elif col_name == "Рейтинг":
-                rating_col = col_idx
-            elif col_name == "Регион":
-                region_col = col_idx
-
-        for row_idx in range(5, end_row + 1):
-            # Color ratings
-            if rating_col:
-                cell = ws.cell(row=row_idx, column=rating_col)
-                rating = str(cell.value or "")
-                color = RATING_COLORS.get(rating)
-                if color:
-                    cell.font = Font(name="Calibri", size=10, bold=True, color=WHITE)
-                    cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-
-            # Bold Tashkent rows
-            if region_col:
-                region_cell = ws.cell(row=row_idx, column=region_col)
-                region_val = str(region_cell.value or "").lower()
-                if "toshkent" in region_val or "тошкент" in region_val or "ташкент" in region_val:
-                    for c in range(1, len(df.columns) + 1):
-                        ws.cell(row=row_idx, column=c).font = Font(
-                            name="Calibri", size=10, bold=True
-                        )
-
-            # Highlight UET row
-            if stir_col:
-                if str(ws.cell(row=row_idx, column=stir_col).value) == uet_stir:
-                    for c in range(1, len(df.columns) + 1):
-                        ws.cell(row=row_idx, column=c).fill = UET_ROW_FILL
+        tashkent_mask = (
+            df["Регион"].astype(str).str.lower()
+            .str.contains("toshkent|тошкент|ташкент", na=False).to_numpy()
+            if "Регион" in df.columns else ()
+        )
+
+        # Color ratings
+        self._paint_ratings(ws, df, "Рейтинг", 5)
+
+        # Highlight UET row
+        self._highlight_stir(ws, df, 5, uet_stir)
+
+        # Bold Tashkent rows
+        for row_idx, is_tashkent in enumerate(tashkent_mask, start=5):
+            if is_tashkent:
+                self._style_row(ws, row_idx, len(df.columns), font=BOLD_FONT)
 
         # Insight box below table
         row = end_row + 2
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=10)
-        note = ws.cell(row=row, column=1)
-        note.value = (
+        note = self._set_cell(ws, row, 1, (
             "ОБРАТИТЕ ВНИМАНИЕ: Большинство лидеров по тендерам имеют низкий рейтинг (DDD/DD). "
             "Рейтинг не является барьером для участия в тендерах. "
             "UET Construction с рейтингом B может использовать это как конкурентное преимущество."
-        )
-        note.font = Font(name="Calibri", size=10, bold=True, color=YELLOW_FONT)
+        ))
+        note.font = _font(10, YELLOW_FONT, bold=True)
         note.fill = YELLOW_FILL
-        note.alignment = Alignment(wrap_text=True)
+        note.alignment = WRAP_ALIGNMENT
         ws.row_dimensions[row].height = 40
 
         self._auto_fit(ws)
@@ -348,43 +386,42 @@ class ExcelReportGenerator:
     #  SHEET 3: ПРОФИЛЬ UET (The Key Sheet)
     # ═══════════════════════════════════════════════════════════
 
-    async def _sheet_uet_profile(self, wb: Workbook, stir: str) -> None:
-        ws = wb.create_sheet("Профиль UET")
+    async def _sheet_uet_profile(self, ws: Worksheet, stir: str) -> None:
+        logger.info("Sheet 3/5: Профиль UET")
 
-        uet = await get_uet_profile(self.pool, stir)
+        uet, breakdown, benchmark, gaps, mkt = await asyncio.gather(
+            get_uet_profile(self.pool, stir),
+            get_uet_rating_breakdown(self.pool, stir),
+            get_top50_benchmark(self.pool),
+            get_uet_competitiveness_gaps(self.pool, stir, limit=10),
+            get_market_summary_combined(self.pool),
+        )
         if not uet:
-            ws["A1"] = f"Компания со СТИР {stir} не найдена"
+            self._set_cell(ws, 1, 1, f"Компания со СТИР {stir} не найдена")
             return
+        mkt_12m = mkt["last_12m"]
 
         score = float(uet.get("rating_score") or 0)
-        percentile = await get_uet_rating_percentile(self.pool, Decimal(str(score)))
+        percentile = await get_uet_rating_percentile(self.pool, score)
         total_rated = percentile.get("total_rated", 1)
         rank_position = percentile.get("at_or_above", 0)
         pct = round((1 - rank_position / total_rated) * 100, 1) if total_rated else 0
 
-        breakdown = await get_uet_rating_breakdown(self.pool, stir)
-        benchmark = await get_top50_benchmark(self.pool)
-        detail = await get_uet_rating_detail(self.pool, stir)
-        gaps = await get_uet_competitiveness_gaps(self.pool, stir)
-        mkt_12m = await get_market_summary_12m(self.pool)
-
         # ── Title ──
         ws.merge_cells("A1:H1")
-        ws["A1"] = f"UET CONSTRUCTION — СТРАТЕГИЧЕСКИЙ ПРОФИЛЬ"
-        ws["A1"].font = Font(name="Calibri", size=16, bold=True, color=NAVY)
+        self._set_cell(ws, 1, 1, f"UET CONSTRUCTION — СТРАТЕГИЧЕСКИЙ ПРОФИЛЬ")
+        ws["A1"].font = PAGE_TITLE_FONT
 
         ws.merge_cells("A2:H2")
-        ws["A2"] = f"СТИР: {stir} | Регион: {uet.get('region', 'N/A')} | Рейтинг: {uet.get('rating_letter', 'N/A')} ({score} баллов)"
-        ws["A2"].font = Font(name="Calibri", size=11, color="333333")
+        self._set_cell(ws, 2, 1, f"СТИР: {stir} | Регион: {uet.get('region', 'N/A')} | Рейтинг: {uet.get('rating_letter', 'N/A')} ({score} баллов)")
+        ws["A2"].font = _font(11, "333333")
 
         # ═══ SECTION: STRENGTHS (green) ═══
         row = 4
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        s = ws.cell(row=row, column=1, value="СИЛЬНЫЕ СТОРОНЫ")
-        s.font = Font(name="Calibri", size=13, bold=True, color=GREEN_FONT)
-        s.fill = GREEN_FILL
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = GREEN_FILL
+        self._section_header(
+            ws, row, "СИЛЬНЫЕ СТОРОНЫ",
+            font=_font(13, GREEN_FONT, bold=True), fill=GREEN_FILL,
+        )
 
         row += 1
         strengths = [
@@ -412,22 +449,20 @@ class ExcelReportGenerator:
         for title, desc in strengths:
             ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=3)
             ws.merge_cells(start_row=row, start_column=4, end_row=row, end_column=8)
-            c1 = ws.cell(row=row, column=1, value=title)
-            c1.font = Font(name="Calibri", size=10, bold=True, color=GREEN_FONT)
-            c2 = ws.cell(row=row, column=4, value=desc)
+            c1 = self._set_cell(ws, row, 1, title)
+            c1.font = _font(10, GREEN_FONT, bold=True)
+            c2 = self._set_cell(ws, row, 4, desc)
             c2.font = DATA_FONT
-            c2.alignment = Alignment(wrap_text=True)
+            c2.alignment = WRAP_ALIGNMENT
             ws.row_dimensions[row].height = 35
             row += 1
 
         # ═══ SECTION: GAPS (red) ═══
         row += 1
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        g = ws.cell(row=row, column=1, value="КЛЮЧЕВЫЕ РАЗРЫВЫ")
-        g.font = Font(name="Calibri", size=13, bold=True, color=RED_FONT)
-        g.fill = RED_FILL
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = RED_FILL
+        self._section_header(
+            ws, row, "КЛЮЧЕВЫЕ РАЗРЫВЫ",
+            font=_font(13, RED_FONT, bold=True), fill=RED_FILL,
+        )
 
         row += 1
         gap_items = [
@@ -452,22 +487,20 @@ class ExcelReportGenerator:
         for title, desc in gap_items:
             ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=3)
             ws.merge_cells(start_row=row, start_column=4, end_row=row, end_column=8)
-            c1 = ws.cell(row=row, column=1, value=title)
-            c1.font = Font(name="Calibri", size=10, bold=True, color=RED_FONT)
-            c2 = ws.cell(row=row, column=4, value=desc)
+            c1 = self._set_cell(ws, row, 1, title)
+            c1.font = _font(10, RED_FONT, bold=True)
+            c2 = self._set_cell(ws, row, 4, desc)
             c2.font = DATA_FONT
-            c2.alignment = Alignment(wrap_text=True)
+            c2.alignment = WRAP_ALIGNMENT
             ws.row_dimensions[row].height = 45
             row += 1
 
         # ═══ SECTION: OPPORTUNITY (yellow) ═══
         row += 1
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        o = ws.cell(row=row, column=1, value="ВОЗМОЖНОСТИ")
-        o.font = Font(name="Calibri", size=13, bold=True, color=YELLOW_FONT)
-        o.fill = YELLOW_FILL
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = YELLOW_FILL
+        self._section_header(
+            ws, row, "ВОЗМОЖНОСТИ",
+            font=_font(13, YELLOW_FONT, bold=True), fill=YELLOW_FILL,
+        )
 
         mkt_vol = mkt_12m.get("total_volume", 0)
         one_pct = int(mkt_vol * 0.01) if mkt_vol else 0
@@ -496,17 +529,17 @@ class ExcelReportGenerator:
         for title, desc in opp_items:
             ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=3)
             ws.merge_cells(start_row=row, start_column=4, end_row=row, end_column=8)
-            c1 = ws.cell(row=row, column=1, value=title)
-            c1.font = Font(name="Calibri", size=10, bold=True, color=YELLOW_FONT)
-            c2 = ws.cell(row=row, column=4, value=desc)
+            c1 = self._set_cell(ws, row, 1, title)
+            c1.font = _font(10, YELLOW_FONT, bold=True)
+            c2 = self._set_cell(ws, row, 4, desc)
             c2.font = DATA_FONT
-            c2.alignment = Alignment(wrap_text=True)
+            c2.alignment = WRAP_ALIGNMENT
             ws.row_dimensions[row].height = 45
             row += 1
 
         # ═══ SECTION: Rating breakdown vs benchmark ═══
         row += 2
-        ws.cell(row=row, column=1, value="РЕЙТИНГ: UET vs ТОП-50 КОМПАНИЙ").font = SUBTITLE_FONT
+        self._set_cell(ws, row, 1, "РЕЙТИНГ: UET vs ТОП-50 КОМПАНИЙ").font = SUBTITLE_FONT
         row += 1
 
         if not breakdown.empty and not benchmark.empty:
@@ -528,23 +561,22 @@ class ExcelReportGenerator:
                     val = 0
                 if val > 0:
                     cell.fill = GREEN_FILL
-                    cell.font = Font(name="Calibri", size=10, bold=True, color=GREEN_FONT)
+                    cell.font = _font(10, GREEN_FONT, bold=True)
                 elif val < -5:
                     cell.fill = RED_FILL
-                    cell.font = Font(name="Calibri", size=10, bold=True, color=RED_FONT)
+                    cell.font = _font(10, RED_FONT, bold=True)
             row = end_row
 
         # ═══ Competitiveness gaps detail ═══
         row += 2
-        ws.cell(row=row, column=1, value="ПОТЕНЦИАЛ РОСТА РЕЙТИНГА: Конкурентоспособность").font = SUBTITLE_FONT
-        ws.cell(row=row + 1, column=1, value="Показатели, где UET теряет больше всего баллов").font = SMALL_FONT
+        self._set_cell(ws, row, 1, "ПОТЕНЦИАЛ РОСТА РЕЙТИНГА: Конкурентоспособность").font = SUBTITLE_FONT
+        self._set_cell(ws, row + 1, 1, "Показатели, где UET теряет больше всего баллов").font = SMALL_FONT
         row += 2
 
         if not gaps.empty:
-            top_gaps = gaps.head(10)
-            end_row = self._write_df(ws, top_gaps, start_row=row)
+            end_row = self._write_df(ws, gaps, start_row=row)
             # Color potential column
-            pot_col = len(top_gaps.columns)
+            pot_col = len(gaps.columns)
             for r in range(row + 1, end_row + 1):
                 cell = ws.cell(row=r, column=pot_col)
                 try:
@@ -553,7 +585,7 @@ class ExcelReportGenerator:
                     val = 0
                 if val > 1:
                     cell.fill = RED_FILL
-                    cell.font = Font(name="Calibri", size=10, bold=True, color=RED_FONT)
+                    cell.font = _font(10, RED_FONT, bold=True)
             row = end_row
 
         self._auto_fit(ws)
@@ -567,88 +599,69 @@ class ExcelReportGenerator:
     # ═══════════════════════════════════════════════════════════
 
     async def _sheet_competitors(
-        self, wb: Workbook, uet_stir: str, compare_stirs: list[str] | None,
+        self, ws: Worksheet, uet_stir: str, compare_stirs: list[str] | None,
     ) -> None:
-        ws = wb.create_sheet("Конкуренты")
+        logger.info("Sheet 4/5: Конкуренты")
 
-        tashkent_comp = await get_tashkent_competitors(self.pool, limit=15)
+        all_stirs = [uet_stir] + [s for s in compare_stirs or () if s != uet_stir]
+        if compare_stirs:
+            tashkent_comp, peer_df, rating_comp = await asyncio.gather(
+                get_tashkent_competitors(self.pool, limit=15),
+                get_peer_comparison(self.pool, uet_stir, compare_stirs),
+                get_peer_rating_comparison(self.pool, all_stirs),
+            )
+        else:
+            tashkent_comp = await get_tashkent_competitors(self.pool, limit=15)
 
         # ── Title ──
         ws.merge_cells("A1:J1")
-        ws["A1"] = "КОНКУРЕНТНЫЙ АНАЛИЗ: ТАШКЕНТСКИЙ РЫНОК"
-        ws["A1"].font = Font(name="Calibri", size=16, bold=True, color=NAVY)
+        self._set_cell(ws, 1, 1, "КОНКУРЕНТНЫЙ АНАЛИЗ: ТАШКЕНТСКИЙ РЫНОК")
+        ws["A1"].font = PAGE_TITLE_FONT
 
         ws.merge_cells("A2:J2")
-        ws["A2"] = "Компании, наиболее активные на строительных тендерах в Ташкенте"
+        self._set_cell(ws, 2, 1, "Компании, наиболее активные на строительных тендерах в Ташкенте")
         ws["A2"].font = SMALL_FONT
 
         # ── Tashkent competitors table ──
         row = 4
-        ws.cell(row=row, column=1, value="Топ-15 конкурентов в Ташкенте (по кол-ву побед)").font = SUBTITLE_FONT
+        self._set_cell(ws, row, 1, "Топ-15 конкурентов в Ташкенте (по кол-ву побед)").font = SUBTITLE_FONT
         row += 1
 
         if not tashkent_comp.empty:
             end_row = self._write_df(ws, tashkent_comp, start_row=row)
-
-            # Color-code ratings
-            rating_col = None
-            for ci, cn in enumerate(tashkent_comp.columns, 1):
-                if cn == "Рейтинг":
-                    rating_col = ci
-                    break
-            if rating_col:
-                for r in range(row + 1, end_row + 1):
-                    cell = ws.cell(row=r, column=rating_col)
-                    rating = str(cell.value or "")
-                    color = RATING_COLORS.get(rating)
-                    if color:
-                        cell.font = Font(name="Calibri", size=10, bold=True, color=WHITE)
-                        cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-
+            self._paint_ratings(ws, tashkent_comp, "Рейтинг", row + 1)
             row = end_row + 1
 
         # Insight box
         row += 1
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=10)
-        ins = ws.cell(row=row, column=1)
-        ins.value = (
+        ins = self._set_cell(ws, row, 1, (
             "ВЫВОД: Большинство активных конкурентов в Ташкенте не имеют рейтинга или имеют "
             "рейтинг DDD-CC. UET с рейтингом B (35.36) объективно превосходит по качеству "
             "практически всех активных участников тендеров в регионе."
-        )
-        ins.font = Font(name="Calibri", size=10, bold=True, color=GREEN_FONT)
+        ))
+        ins.font = _font(10, GREEN_FONT, bold=True)
         ins.fill = GREEN_FILL
-        ins.alignment = Alignment(wrap_text=True)
+        ins.alignment = WRAP_ALIGNMENT
         ws.row_dimensions[row].height = 40
 
         # ── Side-by-side comparison ──
         if compare_stirs:
             row += 2
-            ws.cell(row=row, column=1, value="UET vs Выбранные конкуренты").font = SUBTITLE_FONT
+            self._set_cell(ws, row, 1, "UET vs Выбранные конкуренты").font = SUBTITLE_FONT
             row += 1
 
-            peer_df = await get_peer_comparison(self.pool, uet_stir, compare_stirs)
             if not peer_df.empty:
                 end_row = self._write_df(ws, peer_df, start_row=row)
                 # Highlight UET row
-                for r in range(row + 1, end_row + 1):
-                    stir_col = None
-                    for ci, cn in enumerate(peer_df.columns, 1):
-                        if cn == "СТИР":
-                            stir_col = ci
-                            break
-                    if stir_col and str(ws.cell(row=r, column=stir_col).value) == uet_stir:
-                        for c in range(1, len(peer_df.columns) + 1):
-                            ws.cell(row=r, column=c).fill = UET_ROW_FILL
+                self._highlight_stir(ws, peer_df, row + 1, uet_stir)
                 row = end_row
 
             # Rating category comparison
             row += 2
-            ws.cell(row=row, column=1, value="Сравнение рейтинговых категорий").font = SUBTITLE_FONT
+            self._set_cell(ws, row, 1, "Сравнение рейтинговых категорий").font = SUBTITLE_FONT
             row += 1
 
-            all_stirs = [uet_stir] + [s for s in compare_stirs if s != uet_stir]
-            rating_comp = await get_peer_rating_comparison(self.pool, all_stirs)
             if not rating_comp.empty:
                 self._write_df(ws, rating_comp.reset_index(), start_row=row)
 
@@ -660,61 +673,44 @@ class ExcelReportGenerator:
     #  SHEET 5: РЕКОМЕНДАЦИИ (Recommendations)
     # ═══════════════════════════════════════════════════════════
 
-    async def _sheet_recommendations(self, wb: Workbook, uet_stir: str) -> None:
-        ws = wb.create_sheet("Рекомендации")
+    async def _sheet_recommendations(self, ws: Worksheet, uet_stir: str) -> None:
+        logger.info("Sheet 5/5: Рекомендации")
 
-        big_tenders = await get_big_tashkent_tenders(self.pool, limit=15)
-        tash_customers = await get_tashkent_customers(self.pool, limit=10)
-        gaps = await get_uet_competitiveness_gaps(self.pool, uet_stir)
-        mkt_12m = await get_market_summary_12m(self.pool)
+        big_tenders, tash_customers, gaps, uet = await asyncio.gather(
+            get_big_tashkent_tenders(self.pool, limit=15),
+            get_tashkent_customers(self.pool, limit=10),
+            get_uet_competitiveness_gaps(self.pool, uet_stir, limit=10),
+            get_uet_profile(self.pool, uet_stir),
+        )
 
         # ── Title ──
         ws.merge_cells("A1:H1")
-        ws["A1"] = "РЕКОМЕНДАЦИИ ДЛЯ UET CONSTRUCTION"
-        ws["A1"].font = Font(name="Calibri", size=16, bold=True, color=NAVY)
+        self._set_cell(ws, 1, 1, "РЕКОМЕНДАЦИИ ДЛЯ UET CONSTRUCTION")
+        ws["A1"].font = PAGE_TITLE_FONT
 
         ws.merge_cells("A2:H2")
-        ws["A2"] = "Стратегические действия на основе анализа рынка"
+        self._set_cell(ws, 2, 1, "Стратегические действия на основе анализа рынка")
         ws["A2"].font = SMALL_FONT
 
         # ═══ RECOMMENDATION 1: Enter etender ═══
         row = 4
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        r1 = ws.cell(row=row, column=1)
-        r1.value = "1. ВЫХОД НА ETENDER.UZEX.UZ — ПРИОРИТЕТ №1"
-        r1.font = Font(name="Calibri", size=13, bold=True, color=WHITE)
-        r1.fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
+        self._section_header(ws, row, "1. ВЫХОД НА ETENDER.UZEX.UZ — ПРИОРИТЕТ №1")
 
         row += 1
-        rec1_items = [
-            "Зарегистрироваться на etender.uzex.uz как поставщик строительных услуг",
-            "Настроить мониторинг новых тендеров по категориям строительства в Ташкенте",
-            "Начать с тендеров среднего размера (500 млн — 2 млрд UZS) для накопления опыта",
-            "Использовать рейтинг B как конкурентное преимущество в тендерной документации",
-            "Пиковый сезон тендеров: апрель — сентябрь. Подготовку начинать в марте.",
-        ]
-        for item in rec1_items:
+        for item in ETENDER_STEPS:
             ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-            c = ws.cell(row=row, column=1, value=f"  {item}")
+            c = self._set_cell(ws, row, 1, f"  {item}")
             c.font = DATA_FONT
-            c.alignment = Alignment(wrap_text=True)
+            c.alignment = WRAP_ALIGNMENT
             row += 1
 
         # ═══ RECOMMENDATION 2: Target customers ═══
         row += 1
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        r2 = ws.cell(row=row, column=1)
-        r2.value = "2. ЦЕЛЕВЫЕ ЗАКАЗЧИКИ В ТАШКЕНТЕ"
-        r2.font = Font(name="Calibri", size=13, bold=True, color=WHITE)
-        r2.fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
+        self._section_header(ws, row, "2. ЦЕЛЕВЫЕ ЗАКАЗЧИКИ В ТАШКЕНТЕ")
 
         row += 1
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        ws.cell(row=row, column=1, value="Крупнейшие заказчики строительных работ в Ташкенте (за 12 мес.)").font = SECTION_FONT
+        self._set_cell(ws, row, 1, "Крупнейшие заказчики строительных работ в Ташкенте (за 12 мес.)").font = SECTION_FONT
         row += 1
         if not tash_customers.empty:
             end_row = self._write_df(ws, tash_customers, start_row=row)
@@ -722,73 +718,49 @@ class ExcelReportGenerator:
 
         # ═══ RECOMMENDATION 3: Tenders to watch ═══
         row += 1
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        r3 = ws.cell(row=row, column=1)
-        r3.value = "3. КРУПНЫЕ ТЕНДЕРЫ В ТАШКЕНТЕ (последние 6 мес.) — УПУЩЕННЫЕ ВОЗМОЖНОСТИ"
-        r3.font = Font(name="Calibri", size=13, bold=True, color=WHITE)
-        r3.fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
+        self._section_header(ws, row, "3. КРУПНЫЕ ТЕНДЕРЫ В ТАШКЕНТЕ (последние 6 мес.) — УПУЩЕННЫЕ ВОЗМОЖНОСТИ")
 
         row += 1
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        ws.cell(
-            row=row, column=1,
-            value="Эти тендеры прошли без участия UET. Большинство победителей имеют рейтинг ниже UET."
+        self._set_cell(
+            ws, row, 1,
+            "Эти тендеры прошли без участия UET. Большинство победителей имеют рейтинг ниже UET."
         ).font = SMALL_FONT
         row += 1
 
         if not big_tenders.empty:
+            # Unrated winners show a dash; the cached frame is not modified
+            winner_rating = big_tenders["Рейтинг победителя"]
+            big_tenders = big_tenders.assign(**{
+                "Рейтинг победителя": winner_rating.fillna("—").replace({"": "—", "None": "—"}),
+            })
             end_row = self._write_df(ws, big_tenders, start_row=row)
-            # Color-code winner ratings
-            rating_col = None
-            for ci, cn in enumerate(big_tenders.columns, 1):
-                if cn == "Рейтинг победителя":
-                    rating_col = ci
-                    break
-            if rating_col:
-                for r in range(row + 1, end_row + 1):
-                    cell = ws.cell(row=r, column=rating_col)
-                    rv = str(cell.value or "")
-                    color = RATING_COLORS.get(rv)
-                    if color:
-                        cell.font = Font(name="Calibri", size=10, bold=True, color=WHITE)
-                        cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-                    elif not rv or rv == "None" or rv == "":
-                        cell.value = "—"
+            self._paint_ratings(ws, big_tenders, "Рейтинг победителя", row + 1)
             row = end_row + 1
 
         # ═══ RECOMMENDATION 4: Improve rating ═══
         row += 1
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        r4 = ws.cell(row=row, column=1)
-        r4.value = "4. ПЛАН ПОВЫШЕНИЯ РЕЙТИНГА: ОТ B К BB И ВЫШЕ"
-        r4.font = Font(name="Calibri", size=13, bold=True, color=WHITE)
-        r4.fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
+        self._section_header(ws, row, "4. ПЛАН ПОВЫШЕНИЯ РЕЙТИНГА: ОТ B К BB И ВЫШЕ")
 
         row += 1
         ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        gap_to_bb = 40.0 - score if (score := float((await get_uet_profile(self.pool, uet_stir)).get("rating_score") or 0)) else 5
-        ws.cell(
-            row=row, column=1,
-            value=f"UET: {score} баллов. До BB (40.0) не хватает {gap_to_bb:.1f} баллов. "
-                  f"Основной источник роста — категория «Конкурентоспособность» (техника)."
-        ).font = Font(name="Calibri", size=10, bold=True, color=YELLOW_FONT)
+        score = float(uet.get("rating_score") or 0)
+        gap_to_bb = max(40.0 - score, 0.0)
+        self._set_cell(
+            ws, row, 1,
+            f"UET: {score} баллов. До BB (40.0) не хватает {gap_to_bb:.1f} баллов. "
+            f"Основной источник роста — категория «Конкурентоспособность» (техника)."
+        ).font = _font(10, YELLOW_FONT, bold=True)
         ws.cell(row=row, column=1).fill = YELLOW_FILL
-        ws.cell(row=row, column=1).alignment = Alignment(wrap_text=True)
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = YELLOW_FILL
+        ws.cell(row=row, column=1).alignment = WRAP_ALIGNMENT
         ws.row_dimensions[row].height = 35
         row += 2
 
-        ws.cell(row=row, column=1, value="Топ-10 показателей, где UET теряет баллы (потенциал роста)").font = SECTION_FONT
+        self._set_cell(ws, row, 1, "Топ-10 показателей, где UET теряет баллы (потенциал роста)").font = SECTION_FONT
         row += 1
         if not gaps.empty:
-            top_gaps = gaps.head(10)
-            end_row = self._write_df(ws, top_gaps, start_row=row)
-            pot_col = len(top_gaps.columns)
+            end_row = self._write_df(ws, gaps, start_row=row)
+            pot_col = len(gaps.columns)
             for r in range(row + 1, end_row + 1):
                 cell = ws.cell(row=r, column=pot_col)
                 try:
@@ -797,33 +769,19 @@ class ExcelReportGenerator:
                     val = 0
                 if val >= 2:
                     cell.fill = RED_FILL
-                    cell.font = Font(name="Calibri", size=10, bold=True, color=RED_FONT)
+                    cell.font = _font(10, RED_FONT, bold=True)
                 elif val >= 1:
                     cell.fill = YELLOW_FILL
             row = end_row + 1
 
         # ═══ RECOMMENDATION 5: Seasonal strategy ═══
         row += 1
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-        r5 = ws.cell(row=row, column=1)
-        r5.value = "5. СЕЗОННАЯ СТРАТЕГИЯ"
-        r5.font = Font(name="Calibri", size=13, bold=True, color=WHITE)
-        r5.fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
-        for c in range(2, 9):
-            ws.cell(row=row, column=c).fill = PatternFill(start_color=NAVY, end_color=NAVY, fill_type="solid")
+        self._section_header(ws, row, "5. СЕЗОННАЯ СТРАТЕГИЯ")
 
         row += 1
-        seasonal = [
-            "Март: Подготовка тендерной документации, анализ предстоящих закупок",
-            "Апрель — Июнь: Пик публикации тендеров. Активное участие.",
-            "Июль: Исторический максимум объёма (1.57 трлн UZS в июле 2025). Пиковая нагрузка.",
-            "Август — Сентябрь: Второй пик активности. Завершение летних проектов.",
-            "Октябрь — Декабрь: Объёмы снижаются. Время для развития мощностей и техники.",
-            "Январь — Февраль: Планирование на следующий сезон.",
-        ]
-        for item in seasonal:
+        for item in SEASONAL_PLAN:
             ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
-            ws.cell(row=row, column=1, value=f"  {item}").font = DATA_FONT
+            self._set_cell(ws, row, 1, f"  {item}").font = DATA_FONT
             row += 1
 
         self._auto_fit(ws)
@@ -841,7 +799,11 @@ class ExcelReportGenerator:
         df: pd.DataFrame,
         start_row: int = 1,
     ) -> int:
-        """Write a DataFrame with styled headers. Returns last data row."""
+        """Write a DataFrame with styled headers. Returns last data row.
+
+        The table must start below everything already on the sheet: data
+        rows are emitted with ``ws.append`` from one ``to_numpy().tolist()``.
+        """
         if df.empty:
             return start_row
 
@@ -849,40 +811,152 @@ class ExcelReportGenerator:
             cell = ws.cell(row=start_row, column=col_idx, value=str(col_name))
             cell.font = HEADER_FONT
             cell.fill = HEADER_FILL
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+            cell.alignment = HEADER_ALIGNMENT
             cell.border = THIN_BORDER
 
-        for row_offset, (_, row_data) in enumerate(df.iterrows(), start=1):
-            data_row = start_row + row_offset
-            for col_idx, value in enumerate(row_data, 1):
-                cell = ws.cell(row=data_row, column=col_idx)
-                if pd.isna(value):
-                    cell.value = ""
-                elif hasattr(value, "item"):
-                    cell.value = value.item()
-                else:
-                    cell.value = value
+        # object dtype turns numpy scalars into Python ones; NULLs print blank
+        values = df.astype(object).where(df.notna(), "")
+        for row in values.to_numpy().tolist():
+            ws.append(row)
 
-                cell.font = DATA_FONT
-                cell.border = THIN_BORDER
+        # Longest header or value per column, for _auto_fit
+        widths = self._col_widths.setdefault(ws.title, {})
+        longest = np.maximum(
+            df.columns.astype(str).str.len().to_numpy(),
+            values.astype(str).apply(lambda col: col.str.len().max()).to_numpy(),
+        )
+        for col_idx, width in enumerate(longest, 1):
+            widths[col_idx] = max(widths.get(col_idx, 0), int(width))
+
+        # Thousands separators for large numbers, decided per numeric column
+        currency = np.zeros(df.shape, dtype=bool)
+        for col_pos, (_, series) in enumerate(df.items()):
+            if is_numeric_dtype(series) and not is_bool_dtype(series):
+                currency[:, col_pos] = (series.abs() >= 1000).to_numpy()
+
+        end_row = start_row + len(df)
+        for row_pos, cells in enumerate(
+            ws.iter_rows(min_row=start_row + 1, max_row=end_row, max_col=len(df.columns)),
+        ):
+            alt = row_pos % 2 == 1
+            for cell, is_currency in zip(cells, currency[row_pos]):
+                cell.style = DATA_STYLE_NAMES[alt, bool(is_currency)]
+
+        return end_row
+
+    def _set_cell(self, ws: Any, row: int, column: int, value: Any) -> Any:
+        """Write one cell and count its text toward the column width for _auto_fit."""
+        cell = ws.cell(row=row, column=column, value=value)
+        if value is not None and value != "":
+            widths = self._col_widths.setdefault(ws.title, {})
+            widths[column] = max(widths.get(column, 0), len(str(value)))
+        return cell
+
+    def _section_header(
+        self,
+        ws: Any,
+        row: int,
+        title: str,
+        font: Font = BANNER_FONT,
+        fill: PatternFill = HEADER_FILL,
+    ) -> None:
+        """Section banner merged across A:H; only the anchor cell is styled."""
+        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=8)
+        cell = self._set_cell(ws, row, 1, title)
+        cell.font = font
+        cell.fill = fill
 
-                if row_offset % 2 == 0:
-                    cell.fill = ALT_ROW_FILL
+    def _callout(
+        self,
+        ws: Any,
+        row: int,
+        col: int,
+        label: str,
+        value: Any,
+        value_size: int,
+    ) -> None:
+        """Two-column metric box: a small label over a large value.
+
+        Only the anchor cell of each merged pair is written and styled.
+        Float values are UZS amounts: they stay numeric and are scaled to
+        млн / млрд / трлн by the cell's number format.
+        """
+        ws.merge_cells(start_row=row, start_column=col, end_row=row, end_column=col + 1)
+        ws.merge_cells(start_row=row + 1, start_column=col, end_row=row + 1, end_column=col + 1)
+        label_cell = self._set_cell(ws, row, col, label)
+        label_cell.font = _font(9, "666666")
+        label_cell.fill = LIGHT_BLUE_FILL
+        label_cell.alignment = CENTER_ALIGNMENT
+        value_cell = self._set_cell(ws, row + 1, col, value)
+        value_cell.font = _font(value_size, NAVY, bold=True)
+        value_cell.fill = LIGHT_BLUE_FILL
+        value_cell.alignment = CENTER_ALIGNMENT
+        if isinstance(value, float):
+            value_cell.number_format = _uzs_format(value)
+
+    def _style_row(
+        self,
+        ws: Any,
+        row: int,
+        ncols: int,
+        font: Font | None = None,
+        fill: PatternFill | None = None,
+    ) -> None:
+        """Apply one shared font and/or fill across ``A{row}`` … ``{ncols}``."""
+        (cells,) = ws.iter_rows(min_row=row, max_row=row, max_col=ncols)
+        for cell in cells:
+            if font is not None:
+                cell.font = font
+            if fill is not None:
+                cell.fill = fill
+
+    def _paint_ratings(
+        self,
+        ws: Any,
+        df: pd.DataFrame,
+        column: str,
+        first_row: int,
+    ) -> None:
+        """Colour a rating-letter column of a written table with the badge styles.
 
-                if isinstance(cell.value, (int, float)):
-                    if abs(cell.value) >= 1000:
-                        cell.number_format = CURRENCY_FORMAT
+        Ratings are read from ``df``; only the cells that get a badge are
+        touched.  ``first_row`` is the sheet row holding ``df``'s first row.
+        """
+        if column not in df.columns:
+            return
+        col = df.columns.get_loc(column) + 1
+        for offset, rating in enumerate(df[column]):
+            fill = RATING_FILLS.get(rating)
+            if fill:
+                cell = ws.cell(row=first_row + offset, column=col)
+                cell.font = RATING_FONT
+                cell.fill = fill
+
+    def _highlight_stir(
+        self,
+        ws: Any,
+        df: pd.DataFrame,
+        first_row: int,
+        stir: str,
+    ) -> None:
+        """Fill the table rows whose СТИР is ``stir``, located in ``df``.
 
-        return start_row + len(df)
+        ``first_row`` is the sheet row holding ``df``'s first data row.
+        """
+        if "СТИР" not in df.columns:
+            return
+        for offset in (df["СТИР"].astype(str) == stir).to_numpy().nonzero()[0]:
+            self._style_row(ws, first_row + int(offset), len(df.columns), fill=UET_ROW_FILL)
 
     def _auto_fit(self, ws: Any) -> None:
-        """Auto-fit column widths based on content."""
-        for col_cells in ws.columns:
-            max_length = 0
-            col_letter = get_column_letter(col_cells[0].column)
-            for cell in col_cells:
-                if cell.value:
-                    length = len(str(cell.value))
-                    max_length = max(max_length, length)
-            adjusted = min(max_length + 3, 55)
-            ws.column_dimensions[col_letter].width = max(adjusted, 10)
+        """Fit column widths to the tables written on the sheet.
+
+        Widths are measured as cells are written — tables by
+        :meth:`_write_df`, titles, notes and callouts by :meth:`_set_cell` —
+        so nothing rescans the sheet here (``ws.columns`` would also create
+        a cell for every blank in the used range).
+        """
+        widths = self._col_widths.get(ws.title, {})
+        for col_idx in range(1, ws.max_column + 1):
+            adjusted = min(widths.get(col_idx, 0) + 3, 55)
+            ws.column_dimensions[get_column_letter(col_idx)].width = max(adjusted, 10)
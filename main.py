@@ -9,9 +9,18 @@ from typing import Optional
 import typer
 from loguru import logger
 
-# Configure loguru: remove default, add colored stderr handler
+# Configure loguru: remove default, add stderr handler (colored on a terminal only)
+_LOG_TTY = sys.stderr.isatty()
 logger.remove()
-logger.add(sys.stderr, level="INFO", format="<green>{time:HH:mm:ss}</green> | <level>{level:<7}</level> | {message}")
+logger.add(
+    sys.stderr,
+    level="INFO",
+    format=(
+        "<green>{time:HH:mm:ss}</green> | <level>{level:<7}</level> | {message}"
+        if _LOG_TTY else "{time:HH:mm:ss} | {level:<7} | {message}"
+    ),
+    colorize=_LOG_TTY,
+)
 
 app = typer.Typer(
     name="market-intel",
@@ -169,6 +178,7 @@ def classify():
         pipeline = EnrichmentPipeline(pool)
         count = await pipeline.classify_company_types()
         await pipeline.verify_classification()
+        await pipeline.refresh_materialized_views()
         typer.echo(f"\nClassification complete: {count} companies updated")
         await close_pool()
 
@@ -183,8 +193,8 @@ def analyze(
     stir: Optional[list[str]] = typer.Option(
         None, help="STIR(s) for profile/compare/position",
     ),
-    search: Optional[str] = typer.Option(
-        None, help="Search term for 'search' report",
+    search: Optional[list[str]] = typer.Option(
+        None, help="Search term(s) for 'search' report",
     ),
 ):
     """Run analysis queries and print results."""
@@ -194,6 +204,7 @@ def analyze(
         from analysis.company_profile import get_company_profile
         from analysis.comparison import compare_companies
         from analysis.rankings import (
+            find_companies_by_names,
             find_company_by_name,
             get_company_position,
             get_market_overview,
@@ -250,12 +261,18 @@ def analyze(
             typer.echo(df.to_string(index=False))
 
         elif report == "search":
-            term = search or (stir[0] if stir else "")
-            if not term:
+            terms = search or (stir[:1] if stir else [])
+            if not terms:
                 typer.echo("Укажите --search или --stir")
                 raise typer.Exit(1)
-            df = await find_company_by_name(pool, term)
-            typer.echo(df.to_string(index=False))
+            if len(terms) == 1:
+                df = await find_company_by_name(pool, terms[0])
+                typer.echo(df.to_string(index=False))
+            else:
+                # Several terms: one round-trip for all of them
+                for term, df in (await find_companies_by_names(pool, terms)).items():
+                    typer.echo(f"\n=== {term} ===")
+                    typer.echo(df.to_string(index=False))
 
         else:
             typer.echo(f"Неизвестный отчёт: {report}")
@@ -300,53 +317,59 @@ def run_all(
 ):
     """Full pipeline: discover → scrape → enrich → export."""
     async def _run_all():
-        from db.connection import close_pool, get_pool
-        from export.to_excel import ExcelReportGenerator
+        from db.connection import close_pool, get_pool, health_check
         from pipeline.enrich import EnrichmentPipeline
         from scrapers.etender import ETenderScraper
         from scrapers.reyting import ReytingScraper
 
-        pool = await get_pool()
-
-        # Step 1: Discover
-        logger.info("=== Step 1/5: API Discovery ===")
-        et = ETenderScraper(pool)
-        await et.discover_format()
-
-        # Step 2: Scrape ETender
-        logger.info("=== Step 2/5: Scraping ETender ===")
         try:
-            et_stats = await et.scrape_all(max_pages=max_pages)
-            typer.echo(f"ETender: {et_stats}")
-        finally:
-            await et.close()
+            if not await health_check():
+                typer.echo("База данных недоступна")
+                raise typer.Exit(1)
+            pool = await get_pool()
 
-        # Step 3: Scrape Reyting
-        logger.info("=== Step 3/5: Scraping Reyting ===")
-        rt = ReytingScraper(pool)
-        try:
-            rt_stats = await rt.scrape_companies(limit=stir_limit)
-            typer.echo(f"Reyting: {rt_stats}")
-        finally:
-            await rt.close()
+            # Step 1: Discover
+            logger.info("=== Step 1/5: API Discovery ===")
+            et = ETenderScraper(pool)
+            await et.discover_format()
 
-        # Step 4: Enrich
-        logger.info("=== Step 4/5: Enrichment ===")
-        pipeline = EnrichmentPipeline(pool)
-        enrich_result = await pipeline.run()
-        typer.echo(f"Enrichment: {enrich_result}")
+            # Step 2: Scrape ETender
+            logger.info("=== Step 2/5: Scraping ETender ===")
+            try:
+                et_stats = await et.scrape_all(max_pages=max_pages)
+                typer.echo(f"ETender: {et_stats}")
+            finally:
+                await et.close()
 
-        # Step 5: Export
-        logger.info("=== Step 5/5: Excel Export ===")
-        gen = ExcelReportGenerator(pool)
-        path = await gen.generate_full_report(
-            output_path=output,
-            uet_stir=uet_stir,
-            compare_stirs=compare,
-        )
-        typer.echo(f"\nDone! Report saved: {path}")
+            # Step 3: Scrape Reyting
+            logger.info("=== Step 3/5: Scraping Reyting ===")
+            rt = ReytingScraper(pool)
+            try:
+                rt_stats = await rt.scrape_companies(limit=stir_limit)
+                typer.echo(f"Reyting: {rt_stats}")
+            finally:
+                await rt.close()
 
-        await close_pool()
+            # Step 4: Enrich
+            logger.info("=== Step 4/5: Enrichment ===")
+            pipeline = EnrichmentPipeline(pool)
+            enrich_result = await pipeline.run()
+            typer.echo(f"Enrichment: {enrich_result}")
+
+            # Step 5: Export
+            logger.info("=== Step 5/5: Excel Export ===")
+            # pandas/openpyxl are only needed from here on
+            from export.to_excel import ExcelReportGenerator
+
+            gen = ExcelReportGenerator(pool)
+            path = await gen.generate_full_report(
+                output_path=output,
+                uet_stir=uet_stir,
+                compare_stirs=compare,
+            )
+            typer.echo(f"\nDone! Report saved: {path}")
+        finally:
+            await close_pool()
 
     _run(_run_all())
 
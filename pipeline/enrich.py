@@ -2,17 +2,33 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 
 import asyncpg
 from loguru import logger
 
+from analysis.cache import invalidate_caches
 from config import config
 
 
+def _rowcount(status: str) -> int:
+    """Row count from an asyncpg command status such as ``UPDATE 42``."""
+    return int(status.rpartition(" ")[2]) if status else 0
+
+
 class EnrichmentPipeline:
     """Computes derived statistics on the companies table after scraping."""
 
+    # Report aggregates refreshed after every enrichment run
+    MATERIALIZED_VIEWS: tuple[str, ...] = (
+        "mv_top_companies_overall",
+        "mv_rating_distribution",
+        "mv_top50_benchmark",
+        "mv_company_ranks",
+        "mv_tender_daily",
+    )
+
     def __init__(self, pool: asyncpg.Pool) -> None:
         self.pool = pool
 
@@ -21,26 +37,40 @@ class EnrichmentPipeline:
         logger.info("Starting enrichment pipeline (lookback={}m)", lookback_months)
         results: dict[str, int] = {}
 
-        # Step 1: Classify company types BEFORE aggregation
-        results["classified"] = await self.classify_company_types()
+        # Steps 1-3 rewrite companies and tender_results: run them on one
+        # connection in one transaction, so readers never see a half-enriched
+        # table and the whole batch commits with a single WAL flush.
+        # Enrichment is idempotent (a lost commit is simply re-run), so the
+        # commit need not wait for that flush.
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SET LOCAL synchronous_commit = off")
+
+            # Step 1: Classify company types BEFORE aggregation
+            results["classified"] = await self.classify_company_types(conn)
 
-        # Step 2: Fill missing regions on tender_results
-        results["regions_filled"] = await self.fill_missing_regions()
+            # Step 2: Fill missing regions on tender_results
+            results["regions_filled"] = await self.fill_missing_regions(conn)
 
-        # Step 3: Aggregate tender stats
-        results["tender_stats"] = await self.aggregate_tender_stats(lookback_months)
-        results["regions"] = await self.extract_active_regions()
-        results["source"] = await self.update_company_source()
+            # Step 3: Aggregate tender stats and active regions (one pass)
+            results["tender_stats"] = await self.aggregate_tender_stats(lookback_months, conn)
 
-        # Step 4: Verification
-        await self.verify_classification()
+        # Step 4: Source flag and verification read the committed stats but
+        # touch disjoint columns, so they run concurrently
+        results["source"], _ = await asyncio.gather(
+            self.update_company_source(),
+            self.verify_classification(),
+        )
+
+        # Step 5: Refresh report aggregates (CONCURRENTLY refuses to run
+        # inside a transaction block, so this stays outside)
+        await self.refresh_materialized_views()
 
         logger.info("Enrichment complete: {}", results)
         return results
 
     # ── Layer 1: Company-type classification ──────────────────
 
-    async def classify_company_types(self) -> int:
+    async def classify_company_types(self, conn: asyncpg.Connection | None = None) -> int:
         """Classify companies as contractor, consultant, laboratory, assessor, etc.
 
         Three-pass approach:
@@ -50,6 +80,7 @@ class EnrichmentPipeline:
 
         Idempotent: safe to re-run.
         """
+        db = conn or self.pool
         keywords = config.non_contractor_keywords
         total_classified = 0
 
@@ -75,75 +106,64 @@ class EnrichmentPipeline:
             "expertise": "consultant", "аудит": "consultant", "audit": "consultant",
         }
 
-        # First, do a bulk update for each non-contractor type
-        for company_type in ("laboratory", "assessor", "consultant"):
-            type_kws = [kw for kw, ct in keyword_to_type.items() if ct == company_type]
-            if not type_kws:
-                continue
-
-            # Build ILIKE conditions: canonical_name or any raw_name variant
-            conditions = []
-            params = []
-            for i, kw in enumerate(type_kws, start=1):
-                conditions.append(f"(c.canonical_name ILIKE $%d OR c.raw_names::text ILIKE $%d)" % (i, i))
-                params.append(f"%{kw}%")
-
-            where = " OR ".join(conditions)
-            query = f"""
-                UPDATE companies c SET
-                    company_type = '{company_type}',
-                    updated_at = NOW()
-                WHERE ({where})
-                  AND company_type != '{company_type}'
+        # One UPDATE assigns every keyword-matched type.  When several sets
+        # match, consultant wins over assessor over laboratory.  Keywords
+        # outside keyword_to_type (inspection, certification, metrology,
+        # etc.) mark only companies not yet classified as non-contractor
+        # as 'other'.
+        by_type = {
+            ct: [f"%{kw}%" for kw, t in keyword_to_type.items() if t == ct]
+            for ct in ("consultant", "assessor", "laboratory")
+        }
+        other = [f"%{kw}%" for kw in keywords if kw not in keyword_to_type]
+        rows = await db.fetch(
             """
-            result = await self.pool.execute(query, *params)
-            count = int(result.split()[-1]) if result else 0
-            total_classified += count
-            if count > 0:
-                logger.info("Classified {} companies as '{}'", count, company_type)
-
-        # Also catch remaining negative keywords not in keyword_to_type
-        # (inspection, certification, metrology, etc.) → 'other'
-        remaining_kws = [
-            kw for kw in keywords
-            if kw not in keyword_to_type
-        ]
-        if remaining_kws:
-            conditions = []
-            params = []
-            for i, kw in enumerate(remaining_kws, start=1):
-                conditions.append(f"(c.canonical_name ILIKE ${i} OR c.raw_names::text ILIKE ${i})")
-                params.append(f"%{kw}%")
-
-            where = " OR ".join(conditions)
-            query = f"""
+            WITH updated AS (
                 UPDATE companies c SET
-                    company_type = 'other',
+                    company_type = m.new_type,
                     updated_at = NOW()
-                WHERE ({where})
-                  AND company_type NOT IN ('consultant', 'laboratory', 'assessor', 'other')
-            """
-            result = await self.pool.execute(query, *params)
-            count = int(result.split()[-1]) if result else 0
-            total_classified += count
-            if count > 0:
-                logger.info("Classified {} companies as 'other' (non-contractor)", count)
+                FROM (
+                    SELECT stir, CASE
+                        WHEN canonical_name ILIKE ANY($1) OR raw_names_text ILIKE ANY($1)
+                            THEN 'consultant'
+                        WHEN canonical_name ILIKE ANY($2) OR raw_names_text ILIKE ANY($2)
+                            THEN 'assessor'
+                        WHEN canonical_name ILIKE ANY($3) OR raw_names_text ILIKE ANY($3)
+                            THEN 'laboratory'
+                        WHEN (canonical_name ILIKE ANY($4) OR raw_names_text ILIKE ANY($4))
+                             AND company_type NOT IN ('consultant', 'laboratory', 'assessor', 'other')
+                            THEN 'other'
+                    END AS new_type
+                    FROM companies
+                ) m
+                WHERE c.stir = m.stir
+                  AND c.company_type != m.new_type
+                RETURNING c.company_type
+            )
+            SELECT company_type, COUNT(*) AS cnt FROM updated GROUP BY company_type
+            """,
+            by_type["consultant"], by_type["assessor"], by_type["laboratory"], other,
+        )
+        for r in rows:
+            total_classified += r["cnt"]
+            logger.info("Classified {} companies as '{}'", r["cnt"], r["company_type"])
 
         # ── Pass 2: Companies on reyting.mc.uz with no negative match → 'contractor'
-        result = await self.pool.execute("""
+        # Everything not yet classified is 'unknown'; the equality (unlike
+        # NOT IN over the other types) can use idx_companies_type.
+        result = await db.execute("""
             UPDATE companies SET
                 company_type = 'contractor',
                 updated_at = NOW()
-            WHERE rating_score IS NOT NULL
-              AND company_type NOT IN ('consultant', 'laboratory', 'assessor', 'other')
-              AND company_type != 'contractor'
+            WHERE company_type = 'unknown'
+              AND rating_score IS NOT NULL
         """)
-        count = int(result.split()[-1]) if result else 0
+        count = _rowcount(result)
         total_classified += count
         logger.info("Classified {} rated companies as 'contractor'", count)
 
         # ── Pass 3: Remaining with tender wins → stay 'unknown'
-        unknown_count = await self.pool.fetchval("""
+        unknown_count = await db.fetchval("""
             SELECT COUNT(*) FROM companies
             WHERE company_type = 'unknown' AND total_wins > 0
         """)
@@ -154,52 +174,86 @@ class EnrichmentPipeline:
         return total_classified
 
     async def verify_classification(self) -> None:
-        """Log verification stats after classification."""
-        # Distribution by type
-        rows = await self.pool.fetch("""
-            SELECT company_type, COUNT(*) as cnt
-            FROM companies
-            GROUP BY company_type
-            ORDER BY cnt DESC
-        """)
+        """Log verification stats after classification.
+
+        The three read-only queries run concurrently on separate pool
+        connections; logging happens once all have returned.
+        """
+        distribution, top_non_contractors, high_impact = await asyncio.gather(
+            # Distribution by type
+            self.pool.fetch("""
+                SELECT company_type, COUNT(*) as cnt
+                FROM companies
+                GROUP BY company_type
+                ORDER BY cnt DESC
+            """),
+            # Top 10 non-contractor companies by wins (eyeball check)
+            self.pool.fetch("""
+                SELECT canonical_name, stir, company_type, total_wins, total_contract_value
+                FROM companies
+                WHERE company_type IN ('consultant', 'laboratory', 'assessor', 'other')
+                  AND total_wins > 0
+                ORDER BY total_wins DESC
+                LIMIT 10
+            """),
+            # High-impact reclassifications (>50 wins)
+            self.pool.fetch("""
+                SELECT canonical_name, stir, company_type, total_wins
+                FROM companies
+                WHERE company_type IN ('consultant', 'laboratory', 'assessor', 'other')
+                  AND total_wins > 50
+                ORDER BY total_wins DESC
+            """),
+        )
+
         logger.info("=== Company type distribution ===")
-        for r in rows:
+        for r in distribution:
             logger.info("  {:15s} {:,}", r["company_type"], r["cnt"])
 
-        # Top 10 non-contractor companies by wins (eyeball check)
-        rows = await self.pool.fetch("""
-            SELECT canonical_name, stir, company_type, total_wins, total_contract_value
-            FROM companies
-            WHERE company_type IN ('consultant', 'laboratory', 'assessor', 'other')
-              AND total_wins > 0
-            ORDER BY total_wins DESC
-            LIMIT 10
-        """)
-        if rows:
+        if top_non_contractors:
             logger.info("=== Top non-contractors by tender wins (sanity check) ===")
-            for r in rows:
+            for r in top_non_contractors:
                 logger.info("  [{:11s}] {:40s} STIR={} wins={} value={:,.0f}",
                             r["company_type"], r["canonical_name"],
                             r["stir"], r["total_wins"],
                             float(r["total_contract_value"] or 0))
 
-        # High-impact reclassifications (>50 wins)
-        rows = await self.pool.fetch("""
-            SELECT canonical_name, stir, company_type, total_wins
-            FROM companies
-            WHERE company_type IN ('consultant', 'laboratory', 'assessor', 'other')
-              AND total_wins > 50
-            ORDER BY total_wins DESC
-        """)
-        if rows:
+        if high_impact:
             logger.info("=== HIGH-IMPACT: Non-contractors with >50 wins ===")
-            for r in rows:
+            for r in high_impact:
                 logger.info("  [{:11s}] {:40s} wins={}", r["company_type"],
                             r["canonical_name"], r["total_wins"])
 
+    # ── Report materialized views ─────────────────────────────
+
+    async def refresh_materialized_views(self) -> None:
+        """Refresh the report aggregate views without blocking readers.
+
+        The ranking exclusions are synced from config first, so
+        mv_company_ranks is ranked over the configured contractor pool.
+        Also drops in-process analysis caches, so a report generated later
+        in the same run (``run-all``) sees the fresh data.
+        """
+        excluded = sorted(config.excluded_company_types)
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute(
+                "DELETE FROM ranking_excluded_company_types WHERE NOT (company_type = ANY($1::text[]))",
+                excluded,
+            )
+            await conn.execute(
+                """INSERT INTO ranking_excluded_company_types (company_type)
+                   SELECT unnest($1::text[])
+                   ON CONFLICT DO NOTHING""",
+                excluded,
+            )
+        for view in self.MATERIALIZED_VIEWS:
+            await self.pool.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+        logger.info("Refreshed {} materialized views", len(self.MATERIALIZED_VIEWS))
+        invalidate_caches()
+
     # ── Region enrichment ─────────────────────────────────────
 
-    async def fill_missing_regions(self) -> int:
+    async def fill_missing_regions(self, conn: asyncpg.Connection | None = None) -> int:
         """Fill NULL regions on tender_results using multiple fallback layers.
 
         Layer 1: Normalize existing region values (Latin→Cyrillic canonical).
@@ -208,68 +262,73 @@ class EnrichmentPipeline:
 
         Returns total rows updated.
         """
+        db = conn or self.pool
         total = 0
 
         # ── Layer 1: Normalize existing region values ──
+        # One UPDATE per table, joining against the variant → canonical map
         norm_map = config.region_normalization
-        for variant, canonical in norm_map.items():
-            result = await self.pool.execute(
-                "UPDATE tender_results SET region = $1 WHERE region = $2",
-                canonical, variant,
-            )
-            count = int(result.split()[-1]) if result else 0
-            total += count
+        variants, canonicals = list(norm_map), list(norm_map.values())
+        result = await db.execute(
+            """
+            UPDATE tender_results t SET region = m.canonical
+            FROM unnest($1::text[], $2::text[]) AS m(variant, canonical)
+            WHERE t.region = m.variant
+            """,
+            variants, canonicals,
+        )
+        total += _rowcount(result)
         # Also normalize on companies table
-        for variant, canonical in norm_map.items():
-            await self.pool.execute(
-                "UPDATE companies SET region = $1 WHERE region = $2",
-                canonical, variant,
-            )
+        await db.execute(
+            """
+            UPDATE companies c SET region = m.canonical
+            FROM unnest($1::text[], $2::text[]) AS m(variant, canonical)
+            WHERE c.region = m.variant
+            """,
+            variants, canonicals,
+        )
         logger.info("Layer 1 (normalize): {} tender region values canonicalized", total)
 
         # ── Layer 2: Fill from provider company's region ──
-        result = await self.pool.execute("""
+        result = await db.execute("""
             UPDATE tender_results t SET region = c.region
             FROM companies c
             WHERE t.provider_stir = c.stir
               AND t.region IS NULL
               AND c.region IS NOT NULL
         """)
-        layer2 = int(result.split()[-1]) if result else 0
+        layer2 = _rowcount(result)
         total += layer2
         logger.info("Layer 2 (provider region): {} tenders filled", layer2)
 
         # ── Layer 3: Text extraction from customer_name + deal_description ──
-        # Check region names, Russian oblast names, and district/city names
-        all_patterns: dict[str, str] = {}
-        # Direct region names
-        for region in config.regions:
-            canonical = norm_map.get(region, region)
-            all_patterns[region] = canonical
-        # Russian/district variants
-        for pattern, canonical in {**norm_map, **config.district_to_region}.items():
-            all_patterns[pattern] = canonical
-
-        layer3 = 0
-        for pattern, canonical in all_patterns.items():
-            result = await self.pool.execute(
-                """
-                UPDATE tender_results SET region = $1
-                WHERE region IS NULL
-                  AND (customer_name ILIKE $2 OR deal_description ILIKE $2)
-                """,
-                canonical, f"%{pattern}%",
-            )
-            count = int(result.split()[-1]) if result else 0
-            layer3 += count
+        # Region names, Russian oblast names, and district/city names.  One
+        # UPDATE for all patterns; the first matching pattern (in
+        # config.region_text_patterns order) decides a tender's region.
+        result = await db.execute(
+            """
+            UPDATE tender_results t SET region = m.canonical
+            FROM (
+                SELECT DISTINCT ON (r.id) r.id, p.canonical
+                FROM tender_results r
+                JOIN unnest($1::text[], $2::text[]) WITH ORDINALITY AS p(pattern, canonical, ord)
+                  ON r.customer_name ILIKE p.pattern OR r.deal_description ILIKE p.pattern
+                WHERE r.region IS NULL
+                ORDER BY r.id, p.ord
+            ) m
+            WHERE t.id = m.id
+            """,
+            *config.region_text_patterns,
+        )
+        layer3 = _rowcount(result)
         total += layer3
         logger.info("Layer 3 (text extraction): {} tenders filled", layer3)
 
         # Final stats
-        null_count = await self.pool.fetchval(
+        null_count = await db.fetchval(
             "SELECT COUNT(*) FROM tender_results WHERE region IS NULL"
         )
-        total_count = await self.pool.fetchval(
+        total_count = await db.fetchval(
             "SELECT COUNT(*) FROM tender_results"
         )
         logger.info("Region coverage: {}/{} ({:.1f}%), still NULL: {}",
@@ -280,27 +339,40 @@ class EnrichmentPipeline:
 
     # ── Tender aggregation ─────────────────────────────────────
 
-    async def aggregate_tender_stats(self, lookback_months: int = 12) -> int:
-        """Aggregate tender wins, value, discount into companies table.
-
-        First resets ALL companies to zero, then sets real values for
-        companies with tenders in the lookback window.  This prevents
-        stale data when companies fall out of the window between runs.
+    async def aggregate_tender_stats(
+        self,
+        lookback_months: int = 12,
+        conn: asyncpg.Connection | None = None,
+    ) -> int:
+        """Aggregate tender wins, value, discount and active regions into companies.
+
+        One pass over tender_results sets every company that has tenders:
+        the win/value/discount/date figures are FILTER aggregates over the
+        lookback window (zeros and NULLs when all wins fall outside it),
+        active_regions spans all tenders.  Companies left with stale stats
+        and no tenders at all are reset to zero first.
+
+        Rows whose values would not change are skipped, so a re-run over
+        unchanged data writes nothing.  Returns the number of rows changed.
         """
-        # Step 1: Reset all companies to zero so stale values don't persist
-        await self.pool.execute("""
-            UPDATE companies SET
+        db = conn or self.pool
+        # Step 1: Reset companies that no longer have any tenders
+        await db.execute("""
+            UPDATE companies c SET
                 total_wins           = 0,
                 total_contract_value = 0,
                 avg_discount_pct     = NULL,
                 first_tender_date    = NULL,
                 last_tender_date     = NULL,
                 updated_at           = NOW()
-            WHERE total_wins > 0 OR total_contract_value > 0
+            WHERE (c.total_wins > 0 OR c.total_contract_value > 0)
+              AND NOT EXISTS (
+                  SELECT 1 FROM tender_results t WHERE t.provider_stir = c.stir
+              )
         """)
 
         # Step 2: Set real values from tender_results
-        result = await self.pool.execute(
+        result = await db.execute(
             """
             UPDATE companies c SET
                 total_wins           = agg.win_count,
@@ -308,55 +380,42 @@ class EnrichmentPipeline:
                 avg_discount_pct     = agg.avg_discount,
                 first_tender_date    = agg.first_date,
                 last_tender_date     = agg.last_date,
+                active_regions       = agg.regions,
                 updated_at           = NOW()
             FROM (
                 SELECT
                     provider_stir,
-                    COUNT(*)                         AS win_count,
-                    COALESCE(SUM(deal_cost), 0)      AS total_value,
-                    ROUND(AVG(
-                        CASE WHEN start_cost > 0
-                             THEN (start_cost - deal_cost) / start_cost * 100
-                        END
-                    ), 2)                            AS avg_discount,
-                    MIN(deal_date)                   AS first_date,
-                    MAX(deal_date)                   AS last_date
-                FROM tender_results
-                WHERE provider_stir IS NOT NULL
-                  AND deal_date >= CURRENT_DATE - make_interval(months => $1)
-                GROUP BY provider_stir
-            ) agg
-            WHERE c.stir = agg.provider_stir
-            """,
-            lookback_months,
-        )
-        count = int(result.split()[-1]) if result else 0
-        logger.info("Updated tender stats for {} companies (lookback={}m)", count, lookback_months)
-        return count
-
-    async def extract_active_regions(self) -> int:
-        """Collect distinct regions from tenders into companies.active_regions."""
-        result = await self.pool.execute(
-            """
-            UPDATE companies c SET
-                active_regions = agg.regions,
-                updated_at     = NOW()
-            FROM (
-                SELECT
-                    provider_stir,
+                    COUNT(*) FILTER (WHERE in_window)                AS win_count,
+                    COALESCE(SUM(deal_cost) FILTER (WHERE in_window), 0) AS total_value,
+                    ROUND((AVG(discount_rate) FILTER (WHERE in_window))::numeric, 2)
+                                                                     AS avg_discount,
+                    MIN(deal_date) FILTER (WHERE in_window)          AS first_date,
+                    MAX(deal_date) FILTER (WHERE in_window)          AS last_date,
                     COALESCE(
                         jsonb_agg(DISTINCT region) FILTER (WHERE region IS NOT NULL),
                         '[]'::jsonb
-                    ) AS regions
-                FROM tender_results
-                WHERE provider_stir IS NOT NULL
+                    )                                                AS regions
+                FROM (
+                    SELECT
+                        provider_stir, deal_cost, discount_rate, deal_date, region,
+                        deal_date >= CURRENT_DATE - make_interval(months => $1) AS in_window
+                    FROM tender_results
+                    WHERE provider_stir IS NOT NULL
+                ) t
                 GROUP BY provider_stir
             ) agg
             WHERE c.stir = agg.provider_stir
-            """
+              AND (c.total_wins, c.total_contract_value, c.avg_discount_pct,
+                   c.first_tender_date, c.last_tender_date, c.active_regions)
+                  IS DISTINCT FROM
+                  (agg.win_count, agg.total_value, agg.avg_discount,
+                   agg.first_date, agg.last_date, agg.regions)
+            """,
+            lookback_months,
         )
-        count = int(result.split()[-1]) if result else 0
-        logger.info("Updated active regions for {} companies", count)
+        count = _rowcount(result)
+        logger.info("Updated tender stats and active regions for {} companies (lookback={}m)",
+                    count, lookback_months)
         return count
 
     async def update_company_source(self) -> int:
@@ -371,6 +430,6 @@ class EnrichmentPipeline:
               AND source != 'both'
             """
         )
-        count = int(result.split()[-1]) if result else 0
+        count = _rowcount(result)
         logger.info("Marked {} companies with source='both'", count)
         return count
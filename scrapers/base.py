@@ -4,41 +4,131 @@ from __future__ import annotations
 
 import asyncio
 import json
+import random
 import re
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from decimal import Decimal
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from typing import Any
 
 import asyncpg
 import httpx
+import orjson
 from loguru import logger
 
 from config import config
 
+# Retry backoff bounds (seconds)
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 60.0
+
 # Legal form suffixes to strip when normalising company names
 _LEGAL_FORMS = re.compile(
     r"\b(OOO|MCHJ|МЧЖ|ООО|ОАО|АО|АЖ|AJ|QK|QMJ|ХК|XK|GmbH|LLC|ЯТТ|YaTT|ЧП|XP)\b",
     re.IGNORECASE,
 )
-_EXTRA_SPACES = re.compile(r"\s+")
-_QUOTES = re.compile(r'[«»""\'"]')
+# Quote characters deleted via str.translate (no regex pass needed)
+_QUOTES = str.maketrans("", "", "«»\"'")
+
+# One fixed statement for every progress update, so asyncpg's statement
+# cache holds a single prepared plan; NULL parameters keep the old value.
+_UPDATE_SCRAPE_LOG = """
+    UPDATE scrape_logs SET
+        records_found     = COALESCE($1, records_found),
+        records_inserted  = COALESCE($2, records_inserted),
+        records_updated   = COALESCE($3, records_updated),
+        records_skipped   = COALESCE($4, records_skipped),
+        records_failed    = COALESCE($5, records_failed),
+        last_page_scraped = COALESCE($6, last_page_scraped),
+        details           = COALESCE($7::jsonb, details)
+    WHERE id = $8
+"""
+
+# EXCLUDED.raw_names is the one-element array built in VALUES, so the
+# conflict branch reuses it instead of rebuilding it per check.  The WHERE
+# skips the write (and the dead tuple) when the name is already known and
+# the region has nothing to fill.
+_UPSERT_COMPANY = """
+    INSERT INTO companies (stir, canonical_name, raw_names, region, source)
+    VALUES ($1, $2, jsonb_build_array($3::text), $4, $5)
+    ON CONFLICT (stir) DO UPDATE SET
+        raw_names = CASE
+            WHEN companies.raw_names @> EXCLUDED.raw_names
+            THEN companies.raw_names
+            ELSE companies.raw_names || EXCLUDED.raw_names
+        END,
+        region = COALESCE(companies.region, EXCLUDED.region),
+        updated_at = NOW()
+    WHERE NOT companies.raw_names @> EXCLUDED.raw_names
+       OR (companies.region IS NULL AND EXCLUDED.region IS NOT NULL)
+"""
 
 
+# Providers recur across many tenders, so most raw names are repeats
+@lru_cache(maxsize=200_000)
 def clean_company_name(raw: str) -> str:
     """Normalise a company name: strip legal forms, quotes, extra spaces."""
-    name = _QUOTES.sub("", raw)
-    name = _LEGAL_FORMS.sub("", name)
-    name = _EXTRA_SPACES.sub(" ", name).strip()
-    return name.upper()
+    name = _LEGAL_FORMS.sub("", raw.translate(_QUOTES))
+    return " ".join(name.split()).upper()
+
+
+def dump_json(value: Any) -> bytes:
+    """Serialise scraped data for a ``jsonb`` parameter as UTF-8 bytes.
+
+    Uses orjson, which differs from ``json.dumps(ensure_ascii=False,
+    default=str)`` beyond compact separators: datetimes are written
+    natively as RFC 3339 (``T`` separator, not ``str()``), and integers
+    wider than 64 bits are rejected — those values fall back to the
+    stdlib encoder.  The pool's jsonb codec (db.connection) sends the
+    bytes as they are.
+    """
+    try:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        return json.dumps(value, ensure_ascii=False, default=str).encode()
+
+
+def parse_numeric(value: Any, default: float | None = None) -> float | Decimal | None:
+    """Prepare a JSON number for a NUMERIC parameter.
+
+    The pool encodes NUMERIC parameters with ``str`` (db.connection), so
+    JSON ints and floats go through as-is; ``Decimal`` is only needed to
+    validate strings.  Raises ``decimal.InvalidOperation`` for bad strings.
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return Decimal(str(value))
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    """Seconds to wait per a ``Retry-After`` header (delta or HTTP-date)."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
 
 
 def extract_region(text: str) -> str | None:
     """Try to extract an Uzbekistan region name from free text."""
     if not text:
         return None
-    text_lower = text.lower()
-    for region in config.regions:
-        if region.lower() in text_lower:
-            return region
-    return None
+    found = set(config.region_re.findall(text.lower()))
+    if not found:
+        return None
+    # Keep config.regions order as the tie-break when several regions match
+    return next(r for r in config.regions if r.lower() in found)
 
 
 class BaseScraper:
@@ -47,6 +137,12 @@ class BaseScraper:
     def __init__(self, pool: asyncpg.Pool) -> None:
         self.pool = pool
         self.client = httpx.AsyncClient(
+            http2=config.http2,
+            limits=httpx.Limits(
+                max_connections=config.http_max_connections,
+                max_keepalive_connections=config.http_max_connections,
+                keepalive_expiry=config.http_keepalive_expiry,
+            ),
             timeout=config.http_timeout,
             headers={"User-Agent": config.user_agent},
             follow_redirects=True,
@@ -85,7 +181,7 @@ class BaseScraper:
         headers: dict[str, str] | None = None,
         retries: int = 3,
     ) -> httpx.Response:
-        delay = 1.0
+        delay = _BACKOFF_BASE
         for attempt in range(1, retries + 1):
             try:
                 resp = await self.client.request(
@@ -100,10 +196,21 @@ class BaseScraper:
             except (httpx.HTTPStatusError, httpx.ConnectError, httpx.ReadTimeout) as exc:
                 if attempt == retries:
                     raise
-                logger.warning("Attempt {}/{} failed for {}: {}. Retrying in {}s …",
-                               attempt, retries, url, exc, delay)
-                await asyncio.sleep(delay)
-                delay *= 2
+                # Decorrelated jitter, so concurrent scrapers don't retry in lockstep
+                delay = min(_BACKOFF_CAP, random.uniform(_BACKOFF_BASE, delay * 3))
+                wait = delay
+                if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+                    # The server says how long to back off; honour it, jittered
+                    retry_after = _retry_after(exc.response)
+                    if retry_after is not None:
+                        if retry_after > config.http_max_retry_after:
+                            logger.warning("Retry-After {:.0f}s from {} exceeds cap; waiting {:.0f}s",
+                                           retry_after, url, config.http_max_retry_after)
+                            retry_after = config.http_max_retry_after
+                        wait = max(retry_after, delay) * random.uniform(0.8, 1.2)
+                logger.warning("Attempt {}/{} failed for {}: {}. Retrying in {:.1f}s …",
+                               attempt, retries, url, exc, wait)
+                await asyncio.sleep(wait)
         raise RuntimeError("unreachable")
 
     # ── Scrape log management ────────────────────────────────
@@ -117,22 +224,25 @@ class BaseScraper:
         logger.info("Scrape log #{} started for '{}'", log_id, source)
         return log_id
 
-    async def update_scrape_log(self, log_id: int, **kwargs: Any) -> None:
-        sets = []
-        vals: list[Any] = []
-        i = 1
-        for key, val in kwargs.items():
-            if key == "details":
-                sets.append(f"details = ${i}::jsonb")
-                vals.append(json.dumps(val) if not isinstance(val, str) else val)
-            else:
-                sets.append(f"{key} = ${i}")
-                vals.append(val)
-            i += 1
-        vals.append(log_id)
+    async def update_scrape_log(
+        self,
+        log_id: int,
+        *,
+        records_found: int | None = None,
+        records_inserted: int | None = None,
+        records_updated: int | None = None,
+        records_skipped: int | None = None,
+        records_failed: int | None = None,
+        last_page_scraped: int | None = None,
+        details: Any = None,
+    ) -> None:
+        """Update progress counters; fields left as None keep their value."""
+        if details is not None and not isinstance(details, (str, bytes)):
+            details = dump_json(details)
         await self.pool.execute(
-            f"UPDATE scrape_logs SET {', '.join(sets)} WHERE id = ${i}",
-            *vals,
+            _UPDATE_SCRAPE_LOG,
+            records_found, records_inserted, records_updated, records_skipped,
+            records_failed, last_page_scraped, details, log_id,
         )
 
     async def finish_scrape_log(
@@ -157,16 +267,21 @@ class BaseScraper:
     ) -> None:
         """Insert company or update its raw_names array if it already exists."""
         canonical = clean_company_name(raw_name)
-        await self.pool.execute(
-            """INSERT INTO companies (stir, canonical_name, raw_names, region, source)
-               VALUES ($1, $2, jsonb_build_array($3::text), $4, $5)
-               ON CONFLICT (stir) DO UPDATE SET
-                   raw_names = CASE
-                       WHEN NOT companies.raw_names @> jsonb_build_array($3::text)
-                       THEN companies.raw_names || jsonb_build_array($3::text)
-                       ELSE companies.raw_names
-                   END,
-                   region = COALESCE(companies.region, EXCLUDED.region),
-                   updated_at = NOW()""",
-            stir, canonical, raw_name, region, source,
+        await self.pool.execute(_UPSERT_COMPANY, stir, canonical, raw_name, region, source)
+
+    async def upsert_companies(
+        self,
+        rows: Sequence[tuple[str, str, str, str | None]],
+    ) -> None:
+        """Batch :meth:`upsert_company` over ``(stir, raw_name, source, region)`` rows.
+
+        Names are cleaned in Python, then one ``executemany`` sends every
+        row over a single prepared statement.
+        """
+        if not rows:
+            return
+        await self.pool.executemany(
+            _UPSERT_COMPANY,
+            [(stir, clean_company_name(raw_name), raw_name, region, source)
+             for stir, raw_name, source, region in rows],
         )
@@ -4,26 +4,75 @@ from __future__ import annotations
 
 import asyncio
 import json
+import re
+from collections import deque
 from datetime import date as Date
-from decimal import Decimal
 from typing import Any
 
 import asyncpg
 from loguru import logger
 
 from config import config
-from scrapers.base import BaseScraper, extract_region
+from scrapers.base import BaseScraper, dump_json, extract_region, parse_numeric
 
 # Page size: how many rows per request
 PAGE_SIZE = 20
 
+# Batch upsert of construction deals: one array per column, unnested.
+# Re-scraped deals are mostly unchanged; the WHERE skips those instead of
+# writing an identical row version (they return no row).
+_UPSERT_DEALS = """
+    INSERT INTO tender_results
+        (deal_id, start_cost, deal_cost, customer_name,
+         provider_stir, provider_name, deal_date,
+         deal_description, participants_count, region, raw_data)
+    SELECT d.deal_id, d.start_cost, d.deal_cost, d.customer_name,
+           d.provider_stir, d.provider_name, d.deal_date,
+           d.deal_description, d.participants_count, d.region, d.raw_data
+    FROM unnest($1::bigint[], $2::numeric[], $3::numeric[], $4::text[],
+                $5::text[], $6::text[], $7::date[],
+                $8::text[], $9::int[], $10::text[], $11::jsonb[])
+        AS d(deal_id, start_cost, deal_cost, customer_name,
+             provider_stir, provider_name, deal_date,
+             deal_description, participants_count, region, raw_data)
+    ON CONFLICT (deal_id) DO UPDATE SET
+        start_cost = EXCLUDED.start_cost,
+        deal_cost = EXCLUDED.deal_cost,
+        customer_name = EXCLUDED.customer_name,
+        provider_name = EXCLUDED.provider_name,
+        deal_date = EXCLUDED.deal_date,
+        deal_description = EXCLUDED.deal_description,
+        participants_count = EXCLUDED.participants_count,
+        region = EXCLUDED.region,
+        raw_data = EXCLUDED.raw_data
+    WHERE (tender_results.start_cost, tender_results.deal_cost,
+           tender_results.customer_name, tender_results.provider_name,
+           tender_results.deal_date, tender_results.deal_description,
+           tender_results.participants_count, tender_results.region,
+           tender_results.raw_data)
+          IS DISTINCT FROM
+          (EXCLUDED.start_cost, EXCLUDED.deal_cost,
+           EXCLUDED.customer_name, EXCLUDED.provider_name,
+           EXCLUDED.deal_date, EXCLUDED.deal_description,
+           EXCLUDED.participants_count, EXCLUDED.region,
+           EXCLUDED.raw_data)
+    RETURNING (xmax = 0) AS is_insert
+"""
+
+_REFRESH_TENDER_DAILY = "REFRESH MATERIALIZED VIEW CONCURRENTLY mv_tender_daily"
+
+
+def _serialize_batch(deals: list[dict[str, Any]]) -> list[bytes]:
+    """raw_data payloads for a batch; run in a worker thread."""
+    return [dump_json(deal) for deal in deals]
+
 
 class ETenderScraper(BaseScraper):
     """Paginates the DealsList API, filters construction deals, stores results."""
 
     API_URL = config.etender_api_url
-    CONSTRUCTION_KEYWORDS: list[str] = config.construction_keywords
-    NON_CONSTRUCTION_KEYWORDS: list[str] = config.non_construction_keywords
+    CONSTRUCTION_RE: re.Pattern[str] = config.construction_re
+    NON_CONSTRUCTION_RE: re.Pattern[str] = config.non_construction_re
 
     # Required headers — API needs Origin/Referer from the SPA
     API_HEADERS: dict[str, str] = {
@@ -70,26 +119,22 @@ class ETenderScraper(BaseScraper):
                 is NOT obviously non-construction → accept.
         """
         category = str(deal.get("category_name") or "").lower()
-        is_non_construction = any(
-            nkw in category for nkw in self.NON_CONSTRUCTION_KEYWORDS
-        )
+        # Both tiers reject a category with a non-construction keyword —
+        # if both match, the deal is ambiguous
+        if self.NON_CONSTRUCTION_RE.search(category):
+            return False
 
         # Tier 1: direct match on the deal's own description
-        if any(kw in category for kw in self.CONSTRUCTION_KEYWORDS):
-            # If category also matches a non-construction keyword,
-            # the deal is ambiguous — reject it.
-            return not is_non_construction
+        if self.CONSTRUCTION_RE.search(category):
+            return True
 
         # Tier 2: secondary signals from party names
-        secondary = " ".join([
-            str(deal.get("customer_name") or ""),
-            str(deal.get("provider_name") or ""),
-        ]).lower()
-
-        if any(kw in secondary for kw in self.CONSTRUCTION_KEYWORDS):
-            return not is_non_construction
-
-        return False
+        customer_name = deal.get("customer_name")
+        provider_name = deal.get("provider_name")
+        if not customer_name and not provider_name:
+            return False
+        secondary = f"{customer_name or ''} {provider_name or ''}".lower()
+        return self.CONSTRUCTION_RE.search(secondary) is not None
 
     # ── Main scraping loop ───────────────────────────────────
 
@@ -120,72 +165,97 @@ class ETenderScraper(BaseScraper):
                         start_page, total_pages, self._total_count)
 
             stats = {"found": 0, "inserted": 0, "updated": 0, "skipped": 0, "failed": 0}
-            page = start_page
+
+            # Sliding window instead of fetch-batch / sleep / store barriers:
+            # up to etender_concurrency page fetches stay in flight, their
+            # starts spaced so that etender_batch_delay is spread over a
+            # window's worth of pages.  Pages are consumed in order; the head
+            # page and any later ones already fetched are stored together.
+            loop = asyncio.get_running_loop()
+            interval = config.etender_batch_delay / config.etender_concurrency
+            window: deque[tuple[int, asyncio.Task[list[dict[str, Any]]]]] = deque()
+            next_page = start_page
+            next_start = loop.time() - interval
+            # Same threshold as the old "3 consecutive empty batches"
+            stop_after = 3 * config.etender_concurrency
             empty_streak = 0
+            pages_done = 0
+
+            def refill() -> None:
+                nonlocal next_page, next_start
+                while len(window) < config.etender_concurrency and next_page <= total_pages:
+                    now = loop.time()
+                    next_start = max(next_start + interval, now)
+                    task = asyncio.create_task(
+                        self._fetch_page(next_page, delay=next_start - now),
+                    )
+                    window.append((next_page, task))
+                    next_page += 1
 
-            while page <= total_pages:
-                # Fetch a batch of pages concurrently
-                batch_size = min(config.etender_concurrency, total_pages - page + 1)
-                tasks = [
-                    self._fetch_page(p) for p in range(page, page + batch_size)
-                ]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                all_empty = True
-                for i, result in enumerate(results):
-                    current_page = page + i
-                    if isinstance(result, Exception):
-                        logger.error("Page {} failed: {}", current_page, result)
-                        stats["failed"] += 1
-                        continue
-
-                    items = result
-                    if not items:
-                        continue
-
-                    all_empty = False
-                    for deal in items:
-                        stats["found"] += 1
-                        if self.is_construction_deal(deal):
-                            try:
-                                inserted = await self._store_deal(deal)
-                                if inserted:
-                                    stats["inserted"] += 1
-                                else:
-                                    stats["updated"] += 1
-                            except Exception as exc:
-                                logger.error("Failed to store deal {}: {}",
-                                             deal.get("deal_id"), exc)
-                                stats["failed"] += 1
-                        else:
-                            stats["skipped"] += 1
-
-                if all_empty:
-                    empty_streak += 1
-                    if empty_streak >= 3:
-                        logger.info("3 consecutive empty batches — stopping")
+            try:
+                refill()
+                while window:
+                    await asyncio.wait([window[0][1]])
+                    batch = [window.popleft()]
+                    while window and window[0][1].done():
+                        batch.append(window.popleft())
+                    # Start the next fetches before storing, so the HTTP
+                    # round-trips run while this batch is written
+                    refill()
+
+                    deals: list[tuple[dict[str, Any], str, str | None]] = []
+                    for current_page, task in batch:
+                        exc = task.exception()
+                        if exc is not None:
+                            logger.error("Page {} failed: {}", current_page, exc)
+                            stats["failed"] += 1
+                            empty_streak += 1
+                            continue
+
+                        items = task.result()
+                        if not items:
+                            empty_streak += 1
+                            continue
+
+                        empty_streak = 0
+                        for deal in items:
+                            stats["found"] += 1
+                            if self.is_construction_deal(deal) and deal.get("deal_id") is not None:
+                                deals.append((deal, *self._deal_parties(deal)))
+                            else:
+                                stats["skipped"] += 1
+
+                    await self._store_batch(deals, stats, batch[0][0], batch[-1][0])
+
+                    if empty_streak >= stop_after:
+                        logger.info("{} consecutive empty pages — stopping", empty_streak)
                         break
-                else:
-                    empty_streak = 0
-
-                page += batch_size
 
-                # Progress log every 50 pages
-                if (page - start_page) % 50 < batch_size:
-                    logger.info(
-                        "Progress: page {}/{} | found={} construction={} skipped={}",
-                        page - 1, total_pages,
-                        stats["found"], stats["inserted"], stats["skipped"],
-                    )
-                    await self.update_scrape_log(
-                        log_id,
-                        records_found=stats["found"],
-                        records_inserted=stats["inserted"],
-                        records_skipped=stats["skipped"],
-                        last_page_scraped=page - 1,
-                    )
-
-                await asyncio.sleep(config.etender_batch_delay)
+                    # Progress log every 50 pages
+                    previous, pages_done = pages_done, pages_done + len(batch)
+                    if pages_done // 50 > previous // 50:
+                        last_page = batch[-1][0]
+                        logger.info(
+                            "Progress: page {}/{} | found={} construction={} skipped={}",
+                            last_page, total_pages,
+                            stats["found"], stats["inserted"], stats["skipped"],
+                        )
+                        await self.update_scrape_log(
+                            log_id,
+                            records_found=stats["found"],
+                            records_inserted=stats["inserted"],
+                            records_skipped=stats["skipped"],
+                            last_page_scraped=last_page,
+                        )
+            finally:
+                # Stopped early or failed: drop the prefetched pages
+                for _, task in window:
+                    task.cancel()
+                await asyncio.gather(*(task for _, task in window), return_exceptions=True)
+
+            # The monthly/regional reports read this rollup next to live
+            # tender_results totals; keep them in step after new deals
+            await self.pool.execute(_REFRESH_TENDER_DAILY)
 
             await self.update_scrape_log(
                 log_id,
@@ -203,8 +273,93 @@ class ETenderScraper(BaseScraper):
             await self.finish_scrape_log(log_id, "failed", str(exc))
             raise
 
-    async def _fetch_page(self, page: int) -> list[dict[str, Any]]:
-        """Fetch a single page using From/To row ranges."""
+    async def _store_batch(
+        self,
+        deals: list[tuple[dict[str, Any], str, str | None]],
+        stats: dict[str, int],
+        first_page: int,
+        last_page: int,
+    ) -> None:
+        """Upsert the providers, then the deals, of a run of fetched pages.
+
+        Both steps are single statements per batch; if one fails, its rows
+        are retried one at a time so only the offending deals are lost.
+        """
+        # Providers must exist before their tenders (FK constraint)
+        deals = await self._store_providers(deals, stats, first_page, last_page)
+
+        # Serialising a few pages of raw deals is the heaviest CPU step of a
+        # store; keep it off the event loop so page fetches keep moving
+        try:
+            payloads = await asyncio.to_thread(_serialize_batch, [deal for deal, _, _ in deals])
+        except (TypeError, ValueError) as exc:
+            logger.error("Failed to serialise deals for pages {}-{}: {}", first_page, last_page, exc)
+            stats["failed"] += len(deals)
+            return
+
+        rows = []
+        for (deal, provider_inn, region), raw_data in zip(deals, payloads):
+            try:
+                rows.append(self._deal_row(deal, provider_inn, region, raw_data))
+            except (TypeError, ValueError, ArithmeticError) as exc:
+                logger.error("Failed to parse deal {}: {}", deal.get("deal_id"), exc)
+                stats["failed"] += 1
+        try:
+            inserted = await self._store_deals(rows)
+        except Exception as exc:
+            logger.warning("Deal upsert failed for pages {}-{} ({}); retrying one by one",
+                           first_page, last_page, exc)
+            inserted = []
+            for row in rows:
+                try:
+                    inserted += await self._store_deals([row])
+                except Exception as exc:
+                    logger.error("Failed to store deal {}: {}", row[0], exc)
+                    stats["failed"] += 1
+        stats["inserted"] += sum(inserted)
+        stats["updated"] += len(inserted) - sum(inserted)
+
+    async def _store_providers(
+        self,
+        deals: list[tuple[dict[str, Any], str, str | None]],
+        stats: dict[str, int],
+        first_page: int,
+        last_page: int,
+    ) -> list[tuple[dict[str, Any], str, str | None]]:
+        """Upsert the batch's providers; returns the deals still storable.
+
+        One round-trip normally.  If the batch fails it is retried per
+        provider, and only deals whose provider could not be stored are
+        dropped (and counted as failed).
+        """
+        providers = [
+            (provider_inn, deal.get("provider_name") or "", "etender", region)
+            for deal, provider_inn, region in deals if provider_inn
+        ]
+        try:
+            await self.upsert_companies(providers)
+            return deals
+        except Exception as exc:
+            logger.warning("Provider upsert failed for pages {}-{} ({}); retrying one by one",
+                           first_page, last_page, exc)
+
+        failed: set[str] = set()
+        for stir, raw_name, source, region in providers:
+            try:
+                await self.upsert_company(stir, raw_name, source, region)
+            except Exception as exc:
+                logger.error("Failed to store provider {}: {}", stir, exc)
+                failed.add(stir)
+        if not failed:
+            return deals
+        kept = [d for d in deals if d[1] not in failed]
+        stats["failed"] += len(deals) - len(kept)
+        return kept
+
+    async def _fetch_page(self, page: int, delay: float = 0.0) -> list[dict[str, Any]]:
+        """Fetch a single page using From/To row ranges, after ``delay`` seconds."""
+        if delay > 0:
+            await asyncio.sleep(delay)
         from_row = (page - 1) * PAGE_SIZE + 1
         to_row = page * PAGE_SIZE
         resp = await self.http_post(
@@ -220,70 +375,50 @@ class ETenderScraper(BaseScraper):
         data = resp.json()
         return data if isinstance(data, list) else []
 
-    async def _store_deal(self, deal: dict[str, Any]) -> bool:
-        """Upsert a construction deal. Returns True if new insert, False if update."""
-        deal_id = deal.get("deal_id")
-        if deal_id is None:
-            return False
-
+    def _deal_parties(self, deal: dict[str, Any]) -> tuple[str, str | None]:
+        """Provider STIR ('' when missing or non-standard) and extracted region."""
         provider_inn = str(deal.get("provider_inn") or "").strip()
-        provider_name = deal.get("provider_name") or ""
         customer_name = deal.get("customer_name") or ""
         category_name = deal.get("category_name") or ""
 
         # Extract region from customer/category text
         region = extract_region(customer_name) or extract_region(category_name)
 
-        # Ensure company exists before inserting tender (FK constraint)
         # Skip foreign companies with non-standard STIRs (Uzbek STIR is 9 digits)
         if provider_inn and len(provider_inn) > 9:
             logger.debug("Skipping non-standard STIR: {}", provider_inn)
             provider_inn = ""
+        return provider_inn, region
 
-        if provider_inn:
-            try:
-                await self.upsert_company(
-                    stir=provider_inn,
-                    raw_name=provider_name,
-                    source="etender",
-                    region=region,
-                )
-            except Exception as exc:
-                logger.error("upsert_company failed for STIR={} name={}: {}", provider_inn, provider_name, exc)
-                raise
+    def _deal_row(
+        self,
+        deal: dict[str, Any],
+        provider_inn: str,
+        region: str | None,
+        raw_data: bytes,
+    ) -> tuple[Any, ...]:
+        """Column values for one deal, in _UPSERT_DEALS parameter order."""
+        deal_id = deal["deal_id"]
+        provider_name = deal.get("provider_name") or ""
+        customer_name = deal.get("customer_name") or ""
+        category_name = deal.get("category_name") or ""
 
         # Parse deal_date: "2026-02-14T14:46:45" → datetime.date
         deal_date: Date | None = None
         deal_date_raw = deal.get("deal_date")
         if deal_date_raw:
             try:
-                deal_date = Date.fromisoformat(str(deal_date_raw).split("T")[0])
+                deal_date = Date.fromisoformat(str(deal_date_raw)[:10])
             except ValueError:
                 pass
 
-        start_cost = Decimal(str(deal["start_cost"])) if deal.get("start_cost") is not None else Decimal(0)
-        deal_cost = Decimal(str(deal["deal_cost"])) if deal.get("deal_cost") is not None else Decimal(0)
+        start_cost = parse_numeric(deal.get("start_cost"), 0)
+        deal_cost = parse_numeric(deal.get("deal_cost"), 0)
         logger.debug("Storing deal_id={} start_cost={!r} deal_cost={!r} provider_inn={!r}",
                       deal_id, start_cost, deal_cost, provider_inn)
         participants = int(deal["participants_count"]) if deal.get("participants_count") is not None else 0
 
-        result = await self.pool.fetchrow(
-            """INSERT INTO tender_results
-                   (deal_id, start_cost, deal_cost, customer_name,
-                    provider_stir, provider_name, deal_date,
-                    deal_description, participants_count, region, raw_data)
-               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11::jsonb)
-               ON CONFLICT (deal_id) DO UPDATE SET
-                   start_cost = EXCLUDED.start_cost,
-                   deal_cost = EXCLUDED.deal_cost,
-                   customer_name = EXCLUDED.customer_name,
-                   provider_name = EXCLUDED.provider_name,
-                   deal_date = EXCLUDED.deal_date,
-                   deal_description = EXCLUDED.deal_description,
-                   participants_count = EXCLUDED.participants_count,
-                   region = EXCLUDED.region,
-                   raw_data = EXCLUDED.raw_data
-               RETURNING (xmax = 0) AS is_insert""",
+        return (
             int(deal_id),
             start_cost,
             deal_cost,
@@ -294,6 +429,21 @@ class ETenderScraper(BaseScraper):
             category_name,
             participants,
             region,
-            json.dumps(deal, ensure_ascii=False, default=str),
+            raw_data,
         )
-        return result["is_insert"] if result else False
+
+    async def _store_deals(self, rows: list[tuple[Any, ...]]) -> list[bool]:
+        """Upsert a batch of deal rows in one statement. True per new insert.
+
+        Provider companies must already be upserted.  Rows are sent as one
+        array per column and unnested server-side, so the whole batch is a
+        single round-trip that still reports insert vs update per deal.
+        Deals already stored with the same values yield no entry.
+        """
+        if not rows:
+            return []
+        # A deal_id may appear twice if the listing shifted between pages;
+        # ON CONFLICT cannot touch one row twice, so keep the last copy.
+        rows = list({row[0]: row for row in rows}.values())
+        result = await self.pool.fetch(_UPSERT_DEALS, *map(list, zip(*rows)))
+        return [r["is_insert"] for r in result]
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import asyncio
-import json
 from datetime import date
 from decimal import Decimal
 from typing import Any
@@ -12,7 +11,7 @@ import asyncpg
 from loguru import logger
 
 from config import config
-from scrapers.base import BaseScraper, clean_company_name
+from scrapers.base import BaseScraper, clean_company_name, dump_json, parse_numeric
 
 # API base and headers
 API_BASE = "https://japi-reyting.mc.uz/api"
@@ -32,6 +31,41 @@ AGENCY_TO_CATEGORY: dict[str, str] = {
     "raqobat": "competitiveness",
 }
 
+# Indicator keys whose value is a headcount, by the companies column it fills
+HEADCOUNT_KEYS: dict[str, str] = {
+    "mehnat_total_workers": "employee_count",
+    "mehnat_engineers": "specialist_count",
+}
+
+# Listing upsert; rating fields win over what etender knows.  Every listed
+# company is written, since rating_fetched_at records when the rating was
+# last confirmed, not when it last changed.
+_UPSERT_LISTING_COMPANY = """
+    INSERT INTO companies (stir, canonical_name, raw_names, region,
+        rating_letter, rating_score, rating_fetched_at, source)
+    VALUES ($1, $2, jsonb_build_array($3::text), $4, $5, $6, NOW(), 'reyting')
+    ON CONFLICT (stir) DO UPDATE SET
+        canonical_name = CASE
+            WHEN LENGTH(EXCLUDED.canonical_name) > LENGTH(companies.canonical_name)
+            THEN EXCLUDED.canonical_name
+            ELSE companies.canonical_name
+        END,
+        raw_names = CASE
+            WHEN companies.raw_names @> EXCLUDED.raw_names
+            THEN companies.raw_names
+            ELSE companies.raw_names || EXCLUDED.raw_names
+        END,
+        region = COALESCE(EXCLUDED.region, companies.region),
+        rating_letter = COALESCE(EXCLUDED.rating_letter, companies.rating_letter),
+        rating_score = COALESCE(EXCLUDED.rating_score, companies.rating_score),
+        rating_fetched_at = NOW(),
+        source = CASE
+            WHEN companies.source = 'etender' THEN 'both'
+            ELSE COALESCE(companies.source, 'reyting')
+        END,
+        updated_at = NOW()
+"""
+
 
 class ReytingScraper(BaseScraper):
     """Fetches company ratings from reyting.mc.uz API."""
@@ -40,6 +74,11 @@ class ReytingScraper(BaseScraper):
         super().__init__(pool)
         # Override headers to include reyting-specific ones
         self.client.headers.update(API_HEADERS)
+        # code → id caches for the small, closed criteria/category sets;
+        # warmed by scrape_details, filled on insert under the lock
+        self._criterion_ids: dict[str, int] = {}
+        self._category_ids: dict[str, int] = {}
+        self._criterion_lock = asyncio.Lock()
 
     # ── Listing: paginate all companies ──────────────────────
 
@@ -78,14 +117,20 @@ class ReytingScraper(BaseScraper):
                         page_data = resp.json()
                         companies = page_data["data"]["data"]
 
+                        rows = []
                         for company in companies:
                             stats["found"] += 1
                             try:
-                                await self._store_listing_company(company, type_id)
-                                stats["inserted"] += 1
+                                row = self._listing_row(company)
                             except Exception as exc:
-                                logger.error("Failed to store {}: {}", company.get("inn"), exc)
+                                logger.error("Failed to parse {}: {}", company.get("inn"), exc)
                                 stats["failed"] += 1
+                                continue
+                            if row is not None:
+                                rows.append(row)
+
+                        if rows:
+                            await self._store_listing_rows(rows, stats)
 
                     except Exception as exc:
                         logger.error("Failed page {}/type {}: {}", page, type_id, exc)
@@ -111,11 +156,36 @@ class ReytingScraper(BaseScraper):
             await self.finish_scrape_log(log_id, "failed", str(exc))
             raise
 
-    async def _store_listing_company(self, company: dict[str, Any], type_id: int) -> None:
-        """Store a company from the listing API."""
+    async def _store_listing_rows(
+        self, rows: list[tuple[Any, ...]], stats: dict[str, int],
+    ) -> None:
+        """Upsert a page of listing rows, falling back to one at a time.
+
+        executemany is atomic, so a single bad row would lose the whole
+        page; on failure the rows are retried individually and only the
+        ones that fail again are counted.
+        """
+        try:
+            await self.pool.executemany(_UPSERT_LISTING_COMPANY, rows)
+            stats["inserted"] += len(rows)
+            return
+        except Exception as exc:
+            logger.warning("Batch upsert of {} companies failed ({}); retrying one by one",
+                           len(rows), exc)
+
+        for row in rows:
+            try:
+                await self.pool.execute(_UPSERT_LISTING_COMPANY, *row)
+                stats["inserted"] += 1
+            except Exception as exc:
+                logger.error("Failed to store {}: {}", row[0], exc)
+                stats["failed"] += 1
+
+    def _listing_row(self, company: dict[str, Any]) -> tuple[Any, ...] | None:
+        """Upsert parameters for a company from the listing API (None to skip)."""
         inn = str(company["inn"]).strip()
         if not inn or len(inn) > 9:
-            return
+            return None
 
         name = company.get("name", "")
         rating = company.get("rating", "")
@@ -123,34 +193,7 @@ class ReytingScraper(BaseScraper):
         region = company.get("viloyat_name", "")
 
         canonical = clean_company_name(name)
-        score_decimal = Decimal(str(score)) if score is not None else None
-
-        await self.pool.execute(
-            """INSERT INTO companies (stir, canonical_name, raw_names, region,
-                   rating_letter, rating_score, rating_fetched_at, source)
-               VALUES ($1, $2, jsonb_build_array($3::text), $4, $5, $6, NOW(), 'reyting')
-               ON CONFLICT (stir) DO UPDATE SET
-                   canonical_name = CASE
-                       WHEN LENGTH(EXCLUDED.canonical_name) > LENGTH(companies.canonical_name)
-                       THEN EXCLUDED.canonical_name
-                       ELSE companies.canonical_name
-                   END,
-                   raw_names = CASE
-                       WHEN NOT companies.raw_names @> jsonb_build_array($3::text)
-                       THEN companies.raw_names || jsonb_build_array($3::text)
-                       ELSE companies.raw_names
-                   END,
-                   region = COALESCE(EXCLUDED.region, companies.region),
-                   rating_letter = COALESCE(EXCLUDED.rating_letter, companies.rating_letter),
-                   rating_score = COALESCE(EXCLUDED.rating_score, companies.rating_score),
-                   rating_fetched_at = NOW(),
-                   source = CASE
-                       WHEN companies.source = 'etender' THEN 'both'
-                       ELSE COALESCE(companies.source, 'reyting')
-                   END,
-                   updated_at = NOW()""",
-            inn, canonical, name, region, rating, score_decimal,
-        )
+        return inn, canonical, name, region, rating, parse_numeric(score)
 
     # ── Detail: fetch full rating breakdown ──────────────────
 
@@ -194,35 +237,46 @@ class ReytingScraper(BaseScraper):
                 stirs = [r["stir"] for r in rows]
                 logger.info("Selected {} companies for detail scrape (tender winners first)", len(stirs))
 
+            await self._load_criteria()
+
             stats = {"found": len(stirs), "inserted": 0, "failed": 0}
             sem = asyncio.Semaphore(config.reyting_concurrency)
-
-            async def fetch_one(stir: str) -> None:
-                async with sem:
-                    try:
+            # Pace request starts instead of sleeping inside the semaphore,
+            # which held a slot idle for the whole delay
+            interval = config.reyting_request_delay / config.reyting_concurrency
+
+            async def fetch_one(stir: str, delay: float) -> None:
+                await asyncio.sleep(delay)
+                try:
+                    async with sem:
                         resp = await self.http_get(
                             f"{API_BASE}/v2/category/get/{stir}",
                             params={"type": type_id},
                         )
-                        data = resp.json()
-                        if data.get("success") and data.get("data"):
-                            await self._store_detail(stir, data["data"], type_id)
-                            stats["inserted"] += 1
-                        else:
-                            logger.debug("No detail data for STIR {}", stir)
-                            stats["failed"] += 1
-                    except Exception as exc:
-                        logger.error("Detail fetch failed for {}: {}", stir, exc)
+                    data = resp.json()
+                    if data.get("success") and data.get("data"):
+                        await self._store_detail(stir, data["data"], type_id)
+                        stats["inserted"] += 1
+                    else:
+                        logger.debug("No detail data for STIR {}", stir)
                         stats["failed"] += 1
-                    await asyncio.sleep(config.reyting_request_delay)
-
-            # Process in batches to show progress
-            for i in range(0, len(stirs), 20):
-                batch = stirs[i:i + 20]
-                await asyncio.gather(*[fetch_one(s) for s in batch])
-                logger.info("Detail progress: {}/{} | ok={} fail={}",
-                            min(i + 20, len(stirs)), len(stirs),
-                            stats["inserted"], stats["failed"])
+                except Exception as exc:
+                    logger.error("Detail fetch failed for {}: {}", stir, exc)
+                    stats["failed"] += 1
+
+            # Stream completions rather than gathering batches of 20, so a
+            # slow company no longer holds up the next batch
+            tasks = [asyncio.create_task(fetch_one(s, i * interval)) for i, s in enumerate(stirs)]
+            try:
+                for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                    await task
+                    if done % 20 == 0 or done == len(tasks):
+                        logger.info("Detail progress: {}/{} | ok={} fail={}",
+                                    done, len(tasks), stats["inserted"], stats["failed"])
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
             await self.update_scrape_log(
                 log_id,
@@ -251,15 +305,19 @@ class ReytingScraper(BaseScraper):
                ON CONFLICT (company_stir, rating_date) DO UPDATE SET
                    categories_json = EXCLUDED.categories_json,
                    indicators_json = EXCLUDED.indicators_json,
-                   scraped_at = NOW()""",
+                   scraped_at = NOW()
+               WHERE (company_rating_snapshots.categories_json,
+                      company_rating_snapshots.indicators_json)
+                     IS DISTINCT FROM
+                     (EXCLUDED.categories_json, EXCLUDED.indicators_json)""",
             stir, today,
-            json.dumps(ballar, ensure_ascii=False, default=str),
-            json.dumps(data, ensure_ascii=False, default=str),
+            dump_json(ballar),
+            dump_json(data),
         )
 
-        # Parse each agency group and store EAV indicators
-        total_employees = 0
-        total_specialists = 0
+        # Parse each agency group and collect EAV indicators
+        ratings: dict[int, tuple[str | None, float | Decimal | None, float | Decimal | None]] = {}
+        headcounts: dict[str, int] = {}
 
         for agency_key, agency_data in ballar.items():
             if not isinstance(agency_data, dict):
@@ -293,86 +351,109 @@ class ReytingScraper(BaseScraper):
                 if criterion_id is None:
                     continue
 
-                await self.pool.execute(
-                    """INSERT INTO company_ratings
-                           (company_stir, criterion_id, raw_value, earned_points, max_points, rating_date)
-                       VALUES ($1, $2, $3, $4, $5, $6)
-                       ON CONFLICT (company_stir, criterion_id, rating_date) DO UPDATE SET
-                           raw_value = EXCLUDED.raw_value,
-                           earned_points = EXCLUDED.earned_points,
-                           max_points = EXCLUDED.max_points,
-                           scraped_at = NOW()""",
-                    stir, criterion_id,
-                    str(raw_value) if raw_value is not None else None,
-                    earned, max_pts, today,
+                # Keyed by criterion: a repeated indicator keeps its last value
+                ratings[criterion_id] = (
+                    str(raw_value) if raw_value is not None else None, earned, max_pts,
                 )
 
                 # Track employee/specialist counts from specific indicators
-                if key == "mehnat_total_workers":
+                if (column := HEADCOUNT_KEYS.get(key)) is not None:
                     try:
-                        total_employees = int(float(raw_value))
-                    except (ValueError, TypeError):
-                        pass
-                elif key == "mehnat_engineers":
-                    try:
-                        total_specialists = int(float(raw_value))
+                        headcounts[column] = int(float(raw_value))
                     except (ValueError, TypeError):
                         pass
 
+        # All of the company's indicators in one statement
+        if ratings:
+            raw_values, earned_points, max_points = zip(*ratings.values())
+            await self.pool.execute(
+                """INSERT INTO company_ratings
+                       (company_stir, criterion_id, raw_value, earned_points, max_points, rating_date)
+                   SELECT $1, r.criterion_id, r.raw_value, r.earned_points, r.max_points, $6
+                   FROM unnest($2::int[], $3::text[], $4::numeric[], $5::numeric[])
+                       AS r(criterion_id, raw_value, earned_points, max_points)
+                   ON CONFLICT (company_stir, criterion_id, rating_date) DO UPDATE SET
+                       raw_value = EXCLUDED.raw_value,
+                       earned_points = EXCLUDED.earned_points,
+                       max_points = EXCLUDED.max_points,
+                       scraped_at = NOW()
+                   WHERE (company_ratings.raw_value, company_ratings.earned_points,
+                          company_ratings.max_points)
+                         IS DISTINCT FROM
+                         (EXCLUDED.raw_value, EXCLUDED.earned_points, EXCLUDED.max_points)""",
+                stir, list(ratings), list(raw_values),
+                list(earned_points), list(max_points), today,
+            )
+
         # Update company with employee counts
+        total_employees = headcounts.get("employee_count", 0)
+        total_specialists = headcounts.get("specialist_count", 0)
         if total_employees > 0 or total_specialists > 0:
             await self.pool.execute(
                 """UPDATE companies SET
                        employee_count = COALESCE($2, employee_count),
                        specialist_count = COALESCE($3, specialist_count),
                        updated_at = NOW()
-                   WHERE stir = $1""",
+                   WHERE stir = $1
+                     AND (employee_count, specialist_count) IS DISTINCT FROM
+                         (COALESCE($2, employee_count), COALESCE($3, specialist_count))""",
                 stir,
                 total_employees if total_employees > 0 else None,
                 total_specialists if total_specialists > 0 else None,
             )
 
-    def _parse_decimal(self, val: Any) -> Decimal | None:
-        if val is None:
-            return None
+    def _parse_decimal(self, val: Any) -> float | Decimal | None:
         try:
-            return Decimal(str(val))
+            return parse_numeric(val)
         except Exception:
             return None
 
+    async def _load_criteria(self) -> None:
+        """Warm the criterion and category id caches (two queries per run)."""
+        criteria, categories = await asyncio.gather(
+            self.pool.fetch("SELECT code, id FROM rating_criteria"),
+            self.pool.fetch("SELECT code, id FROM rating_categories"),
+        )
+        self._criterion_ids = {r["code"]: r["id"] for r in criteria}
+        self._category_ids = {r["code"]: r["id"] for r in categories}
+
     async def _ensure_criterion(
         self,
         name: str,
         code: str,
         category_code: str,
-        max_points: Decimal | None,
+        max_points: float | Decimal | None,
         source_agency: str = "",
     ) -> int | None:
         """Get or create a rating_criteria row."""
         if not code:
             code = name.lower().strip().replace(" ", "_")[:100]
 
-        row = await self.pool.fetchrow(
-            "SELECT id FROM rating_criteria WHERE code = $1", code,
-        )
-        if row:
+        criterion_id = self._criterion_ids.get(code)
+        if criterion_id is not None:
+            return criterion_id
+
+        # Concurrent detail fetches can miss on the same new code together;
+        # the lock makes only the first one insert it
+        async with self._criterion_lock:
+            criterion_id = self._criterion_ids.get(code)
+            if criterion_id is not None:
+                return criterion_id
+
+            row = await self.pool.fetchrow(
+                """INSERT INTO rating_criteria (category_id, code, name_uz, name_ru, source_agency, max_points)
+                   VALUES ($1, $2, $3, $4, $5, $6)
+                   ON CONFLICT (code) DO UPDATE SET
+                       name_ru = COALESCE(EXCLUDED.name_ru, rating_criteria.name_ru)
+                   RETURNING id""",
+                self._category_ids.get(category_code, 6),
+                code, name, name, source_agency, max_points,
+            )
+            if row is None:
+                return None
+            self._criterion_ids[code] = row["id"]
             return row["id"]
 
-        cat_row = await self.pool.fetchrow(
-            "SELECT id FROM rating_categories WHERE code = $1", category_code,
-        )
-        category_id = cat_row["id"] if cat_row else 6
-
-        row = await self.pool.fetchrow(
-            """INSERT INTO rating_criteria (category_id, code, name_uz, name_ru, source_agency, max_points)
-               VALUES ($1, $2, $3, $4, $5, $6)
-               ON CONFLICT (code) DO UPDATE SET
-                   name_ru = COALESCE(EXCLUDED.name_ru, rating_criteria.name_ru)
-               RETURNING id""",
-            category_id, code, name, name, source_agency, max_points,
-        )
-        return row["id"] if row else None
-
     # ── Combined entry point ─────────────────────────────────
 
     async def scrape_companies(